@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import numpy as np
+
 from deep_line_wars import entity
 from deep_line_wars.shop import Shop
 
@@ -17,9 +19,14 @@ class BaseActionSpace:
 
         self.actions[a]()
 
+    @classmethod
+    def action_names(cls):
+        # Actions are the public methods of the action-space, indexed in alphabetical order
+        method_list = [func for func in dir(cls) if callable(getattr(cls, func))]
+        return [x for x in method_list if "__" not in str(x) and str(x) not in ["perform", "build", "action_names"]]
+
     def build(self):
-        method_list = [func for func in dir(self.__class__) if callable(getattr(self.__class__, func))]
-        method_list = [getattr(self, x) for x in method_list if "__" not in str(x) and str(x) not in ["perform", "build"]]
+        method_list = [getattr(self, x) for x in self.action_names()]
         self.actions.extend(method_list)
         self.size = len(self.actions)
 
@@ -116,6 +123,174 @@ class StandardActionSpace(BaseActionSpace):
         pass
 
 
+class PlacementActionSpace(BaseActionSpace):
+    """
+    Action space without cursor walking, every send and every tower placement is a single action.
+
+    Action 0 is no action, followed by one action per unit type to send and one per tower type and tile to build at,
+    indexed (tower, x, y). send_action() and build_action() map the factored form to the flat action and decode() maps
+    it back. Purchases follow the same Shop and Building.spawn rules as the StandardActionSpace, and the cursor of the
+    player is moved to where a tower is built so it is drawn there.
+    """
+
+    NO_ACTION = 0
+
+    UNITS = (Shop.MILITIA, Shop.FOOTMAN, Shop.GRUNT, Shop.ARMORED_GRUNT)
+    BUILDINGS = (Shop.BASIC_TOWER, Shop.FAST_TOWER, Shop.FASTER_TOWER)
+
+    def __init__(self, game: 'Game'):
+        super().__init__(game)
+        self.width = game.config.width
+        self.height = game.config.height
+        self.tiles = self.width * self.height
+        self.first_build = 1 + len(self.UNITS)
+        self.size = self.first_build + len(self.BUILDINGS) * self.tiles
+
+        # (key, mask) of the last mask computed by mask()
+        self.cached_mask = None
+
+    def send_action(self, unit: int):
+        # Action sending the unit with the given index into UNITS
+        return 1 + unit
+
+    def build_action(self, tower: int, x: int, y: int):
+        # Action building the tower with the given index into BUILDINGS at (x, y)
+        return self.first_build + (tower * self.width + x) * self.height + y
+
+    def decode(self, a):
+        # (kind, index, x, y) of an action, kind is "no_action", "send" or "build"
+        if a == self.NO_ACTION:
+            return "no_action", None, None, None
+        if a < self.first_build:
+            return "send", a - 1, None, None
+        tower, tile = divmod(a - self.first_build, self.tiles)
+        return "build", tower, tile // self.height, tile % self.height
+
+    def perform(self, a):
+        if a < 0 or a >= self.size:
+            raise ValueError("Out of bounds action %s when size of the action-space is %s" % (a, self.size))
+
+        player = self.game.selected_player
+        kind, index, x, y = self.decode(a)
+        if kind == "send":
+            self.game.shop.buy(player, self.UNITS[index], entity.Ground).spawn(player=player)
+        elif kind == "build":
+            player.virtual_cursor_x = x
+            player.virtual_cursor_y = y
+            self.game.shop.buy(player, self.BUILDINGS[index], entity.Building).spawn(player=player, x=x, y=y)
+
+    def mask(self, player: 'Player' = None):
+        # Read-only boolean vector of the actions that are not a no-op for the player (the selected player by
+        # default), recomputed only when its gold or the building layer of the grid changes
+        game = self.game
+        player = player if player else game.selected_player
+        key = (player.id, player.gold, player.buildings.version, player.opponent.buildings.version)
+        if self.cached_mask is not None and self.cached_mask[0] == key:
+            return self.cached_mask[1]
+
+        mask = np.ones(self.size, dtype=np.bool_)
+        mask[1:self.first_build] = [player.gold > game.shop.units[unit].cost_gold for unit in self.UNITS]
+
+        # Free tiles off the spawn columns, on the own side unless building anywhere is allowed
+        free = game.state.grid[4] == 0
+        free[[0, -1]] = False
+        if not game.config.mechanics.build_anywhere:
+            free[[x for x in range(self.width) if entity.Building.over_center(player, x)]] = False
+
+        cost = np.array([game.shop.buildings[building].cost_gold for building in self.BUILDINGS])
+        mask[self.first_build:] = ((player.gold > cost)[:, None, None] & free).ravel()
+
+        mask.flags.writeable = False
+        self.cached_mask = (key, mask)
+        return mask
+
+
+def get_action_space(action_space):
+    # Action spaces are classes, or "standard" or "placement"
+    if isinstance(action_space, str):
+        return {"standard": StandardActionSpace, "placement": PlacementActionSpace}[action_space]
+    return action_space
+
+
+class ActionMask:
+    """
+    Valid actions of the StandardActionSpace, the actions that would not be a no-op for a player.
+
+    Masks are cached per player and only recomputed when what they depend on changes: the gold and cursor of the
+    player, the building layer of the grid (the building tables of both players) and whether the game is over.
+    """
+
+    CURSOR = {
+        "cursor_left": (-1, 0),
+        "cursor_right": (1, 0),
+        "cursor_up": (0, -1),
+        "cursor_down": (0, 1)
+    }
+
+    SEND = {
+        "send_militia": Shop.MILITIA,
+        "send_footman": Shop.FOOTMAN,
+        "send_grunt": Shop.GRUNT,
+        "send_armored_grunt": Shop.ARMORED_GRUNT
+    }
+
+    BUILD = {
+        "build_basic_tower": Shop.BASIC_TOWER,
+        "build_fast_tower": Shop.FAST_TOWER,
+        "build_faster_tower": Shop.FASTER_TOWER
+    }
+
+    def __init__(self, game: 'Game'):
+        self.game: 'Game' = game
+        names = StandardActionSpace.action_names()
+        self.size = len(names)
+
+        self.cursor_actions = np.array([names.index(name) for name in self.CURSOR])
+        self.cursor_moves = np.array(list(self.CURSOR.values()))
+        self.send_actions = np.array([names.index(name) for name in self.SEND])
+        self.send_cost = np.array([game.shop.units[index].cost_gold for index in self.SEND.values()])
+        self.build_actions = np.array([names.index(name) for name in self.BUILD])
+        self.build_cost = np.array([game.shop.buildings[index].cost_gold for index in self.BUILD.values()])
+
+        # (key, mask) by player id
+        self.cache = {}
+
+    def get(self, player: 'Player'):
+        key = (
+            player.gold, player.virtual_cursor_x, player.virtual_cursor_y, self.game.winner is None,
+            player.buildings.version, player.opponent.buildings.version
+        )
+        cached = self.cache.get(player.id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        mask = self.compute(player)
+        mask.flags.writeable = False
+        self.cache[player.id] = (key, mask)
+        return mask
+
+    def compute(self, player: 'Player'):
+        game = self.game
+        x, y = player.virtual_cursor_x, player.virtual_cursor_y
+        mask = np.ones(self.size, dtype=np.bool_)
+
+        # Cursor moves off the map, or after the game has ended, leave the cursor where it is
+        moved_x = x + self.cursor_moves[:, 0]
+        moved_y = y + self.cursor_moves[:, 1]
+        mask[self.cursor_actions] = (moved_x >= 0) & (moved_x < game.width) & (moved_y >= 0) & (
+            moved_y < game.height) & (game.winner is None)
+
+        mask[self.send_actions] = player.gold > self.send_cost
+
+        # Towers need a free tile off the spawn columns, and on the own side unless building anywhere is allowed
+        free = game.state.grid[4, x, y] == 0 and x != 0 and x != game.width - 1 and (
+            game.config.mechanics.build_anywhere or not entity.Building.over_center(player, x)
+        )
+        mask[self.build_actions] = (player.gold > self.build_cost) & free
+
+        return mask
+
+
 class ContinousActionSpace(BaseActionSpace):
 
     def __init__(self, game):
@@ -1,6 +1,3 @@
-from deep_line_wars.gui import dummy, pygame
-
-
 class Config:
 
     class Map:
@@ -21,12 +18,15 @@ class Config:
                      start_income: int = 20,
                      income_frequency: int = 10,
                      ticks_per_second: int = 10,
-                     fps: int = 10,
-                     ups: int = 10008000,
+                     fps: int = 10,  # Frames per second the Scheduler renders, <= 0 for a frame after every tick
+                     ups: int = 10008000,  # Ticks per second the Scheduler runs, <= 0 for as fast as possible
+                     statps: int = 1,  # Frame and tick rate reports per second from the Scheduler, <= 0 for none
                      income_ratio: int = 0.20,
                      kill_gold_ratio: int = 0.10,
                      enemy_territory_decay=.10,
-                     friendly_territory_decay=.0001
+                     friendly_territory_decay=.0001,
+                     target_policy="first",  # first, closest, lowest_health
+                     frame_skip: int = 1  # Ticks advanced per Game.step, the action is applied on the first
                      ):
             self.build_anywhere = build_anywhere
             self.start_health = start_health
@@ -37,33 +37,50 @@ class Config:
             self.ticks_per_second = ticks_per_second
             self.fps = fps
             self.ups = ups
+            self.statps = statps
             self.income_ratio = income_ratio
             self.kill_gold_ratio = kill_gold_ratio
             self.enemy_territory_decay = enemy_territory_decay
             self.friendly_territory_decay = friendly_territory_decay
+            self.target_policy = target_policy
+            if target_policy not in ("first", "closest", "lowest_health"):
+                raise ValueError("target_policy must be first, closest or lowest_health, not %s" % target_policy)
+            self.frame_skip = frame_skip
 
     class Game:
         def __init__(self,
                      width: int = None,
                      height: int = None,
                      tile_width=32,
-                     tile_height=32
+                     tile_height=32,
+                     seed: int = None,  # None seeds from the OS
+                     action_space="standard"  # Action space class, or standard (cursor moves) or placement
                      ):
             self.width = width
             self.height = height
             self.tile_width = tile_width
             self.tile_height = tile_height
+            self.seed = seed
+            self.action_space = action_space
 
     class GUI:
 
         def __init__(self,
-                     engine=pygame.GUI,
+                     engine="pygame",  # GUI class or module name in deep_line_wars.gui
                      draw_friendly: bool = True,
-                     state_representation="RGB"  # RAW, RGB, L
+                     state_representation="RGB",  # RAW, RGB, L
+                     raw_layout="channels_first",  # channels_first (layer, y, x) or channels_last (y, x, layer)
+                     resolution=None,  # (width, height) the raster engine draws RGB/L states at, None for full tiles
+                     offscreen: bool = False,  # pygame engine draws into memory without opening a display
+                     render_thread: bool = False  # Frames are drawn in a worker thread, see RenderThread
                      ):
             self.engine = engine
             self.draw_friendly = draw_friendly
             self.state_representation = state_representation
+            self.raw_layout = raw_layout
+            self.resolution = resolution
+            self.offscreen = offscreen
+            self.render_thread = render_thread
 
     def __init__(self,
                  game: 'Game' = Game(),
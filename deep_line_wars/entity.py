@@ -1,15 +1,13 @@
-import random
 
-import math
+import abc
 import typing
 import numpy as np
-import cv2
 import time
 
 from deep_line_wars.utils import get_icon
 
 
-class Entity:
+class Entity(abc.ABC):
 
     class Attack:
 
@@ -32,36 +30,27 @@ class Entity:
     icon_template: str = None
     level: str = None
 
-    def __init__(self, player: 'Player'):
-        self.player: 'Player' = player
-        self.x = None
-        self.y = None
+    # Icons with the player outline, shared by every entity of a type and player
+    _icons: typing.Dict[typing.Tuple[typing.Type['Entity'], int], np.ndarray] = {}
 
-        self.tick_speed = 0 if self.speed == 0 else self.player.game.ticks_per_second / self.speed
-        self.tick_counter = self.tick_speed
-        self.despawn: bool = False
-
-        # Draw outline with correct color
-        self.icon_image = cv2.rectangle(self.icon_template, (0, 0), (32, 32), self.player.color, 3)
+    @classmethod
+    def get_icon(cls, player: 'Player'):
+        icon_image = Entity._icons.get((cls, player.id))
+        if icon_image is not None:
+            return icon_image
 
-        # Flip other player
-        if self.player.direction == 1:
-            self.icon_image = cv2.flip(self.icon_image, 0)
+        import cv2
 
-    def update(self):
-        pass
+        # Sprites are loaded on first use. Draw outline with correct color
+        icon_image = cv2.rectangle(get_icon(cls.icon_template), (0, 0), (32, 32), player.color, 3)
 
-    def remove(self):
-        # Unit has reached goal
-        self.despawn = True
-        self.player.game.state.update(self, x=None, y=None)
+        # Flip other player
+        if player.direction == 1:
+            icon_image = cv2.flip(icon_image, 0)
 
-    def damage(self, amount):
-        self.health -= amount
-        if self.health <= 0:
-            # Increase opponents gold with a ratio of what the unit was worth.
-            self.player.opponent.increase_gold(self.cost_gold * self.player.game.config.mechanics.kill_gold_ratio)
-            self.despawn = True
+        icon_image.flags.writeable = False
+        Entity._icons[(cls, player.id)] = icon_image
+        return icon_image
 
     @classmethod
     def can_afford(cls, player: 'Player') -> bool:
@@ -81,42 +70,49 @@ class Entity:
         # Update income
         player.income += cls.cost_gold * player.game.config.mechanics.income_ratio
 
-        if not x and not y:
-            free_spawn_points = player.game.state.free_spawn_points(player)
+        return cls.place(player, x, y)
 
-            if len(free_spawn_points) == 0:
-                player.spawn_queue.append(cls)
-                return False
+    @classmethod
+    @abc.abstractmethod
+    def place(cls, player: 'Player', x: int = None, y: int = None):
+        # Puts a bought entity on the map, returns whether it was placed
+        ...
 
-            spawn_x, spawn_y = random.choice(free_spawn_points)
-        else:
-            spawn_x = x
-            spawn_y = y
 
-        entity = cls(player)
-        player.game.state.update(entity, x=spawn_x, y=spawn_y)
+class Ground(Entity):
 
-        entity.x = spawn_x
-        entity.y = spawn_y
+    @classmethod
+    def place(cls, player: 'Player', x: int = None, y: int = None):
+        if not x and not y:
+            spawn_slots = player.game.state.spawn_slots[player.id - 1]
 
-        player.units.append(entity)
+            if spawn_slots.is_full():
+                player.spawn_queue.append(cls)
+                return False
 
-        return entity
+            x, y = spawn_slots.choice(player.game.random)
 
+        # Units are rows in the players unit table
+        row = player.units.add(cls)
+        player.game.state.update_units(player.units, [row], x=[x], y=[y])
 
-class Ground(Entity):
+        return True
 
-    def update(self):
-        self.move()
+    @staticmethod
+    def move(player: 'Player'):
+        # Moves all units of the player, units that died are left for despawn
+        units = player.units
+        n = len(units)
+        alive = ~units.despawn[:n]
 
-    def move(self):
+        # Wait for the tick-counter to expire
+        tick_counter = units.tick_counter[:n]
+        waiting = alive & (tick_counter > 0)
+        tick_counter[waiting] -= 1
 
-        if self.tick_counter > 0:
-            self.tick_counter -= 1
-            return
-        else:
-            # Reset tick-counter
-            self.tick_counter = self.tick_speed
+        # Reset tick-counter
+        rows = np.flatnonzero(alive & ~waiting)
+        tick_counter[rows] = units.tick_speed[rows]
 
         # If tile is occupied by friendly, try to find a path around it
 
@@ -125,18 +121,15 @@ class Ground(Entity):
         # If tile is occupied and there is not way around, destroy it!
 
         # If unit has reached its final destination
-        next_x = self.x + self.player.direction
-
-        if next_x == self.player.goal_x:
+        next_x = units.x[rows] + player.direction
+        reached = rows[next_x == player.goal_x]
+        if reached.size:
             # Unit has reached goal
-            self.player.opponent.health -= 1
-            self.despawn = True
+            player.opponent.health -= reached.size
+            units.despawn[reached] = True
 
-        # Update position of the unit
-        self.player.game.state.update(self, x=next_x, y=self.y)
-
-    def shoot(self):
-        pass
+        # Update position of the units
+        player.game.state.update_units(units, rows, x=next_x, y=units.y[rows])
 
 
 class Flying(Entity):
@@ -145,24 +138,6 @@ class Flying(Entity):
 
 class Building(Entity):
 
-    def __init__(self, player: 'Player'):
-        super().__init__(player)
-        self.enemy_territory: bool = False
-
-    def update(self):
-        # Process buildings
-        for opp_unit in self.player.opponent.units:
-            success = self.shoot(opp_unit)
-            if success:
-                break
-
-        # Decay health for buildings on enemy territory
-        self.decay()
-
-
-    def move(self):
-        pass
-
     @classmethod
     def spawn(cls, player: 'Player', x: int = None, y: int = None):
 
@@ -170,54 +145,117 @@ class Building(Entity):
         if player.game.state.grid[4, x, y] != 0 or (x == 0 or x == player.game.width - 1):
             return False
 
-        over_center = (player.direction == 1 and not all(i > x for i in player.game.state.center_area) ) or (
-                player.direction == -1 and not all(i < x for i in player.game.state.center_area)
-        )
-
         # Restrict players from placing towers on mid area and on opponents sides
-        if over_center and not player.game.config.mechanics.build_anywhere:
+        if cls.over_center(player, x) and not player.game.config.mechanics.build_anywhere:
             return False
 
-        entity = super().spawn(player, x, y)
+        return super().spawn(player, x, y)
 
-        if entity and over_center:
-            entity.enemy_territory = True
+    @classmethod
+    def place(cls, player: 'Player', x: int = None, y: int = None):
+        # Buildings are rows in the players building table
+        buildings = player.buildings
+        row = buildings.add(cls)
+
+        mechanics = player.game.config.mechanics
+        buildings.enemy_territory[row] = cls.over_center(player, x)
+        buildings.decay[row] = cls.health * (
+            mechanics.enemy_territory_decay if buildings.enemy_territory[row] else mechanics.friendly_territory_decay
+        )
 
-        return entity
+        player.game.state.update_units(buildings, [row], x=[x], y=[y])
 
-    def decay(self):
-        if self.enemy_territory:
-            self.health -= (self.__class__.health * self.player.game.config.mechanics.enemy_territory_decay)
-        else:
-            self.health -= (self.__class__.health * self.player.game.config.mechanics.friendly_territory_decay)
+        return True
 
-        if self.health <= 0:
-            self.despawn = True
+    @staticmethod
+    def over_center(player: 'Player', x: int):
+        return (player.direction == 1 and not all(i > x for i in player.game.state.center_area)) or (
+                player.direction == -1 and not all(i < x for i in player.game.state.center_area)
+        )
 
-    def shoot(self, unit):
-        # Wait for reload (shooting speed)
-        self.tick_counter -= 1
-        if self.tick_counter > 0:
-            return True  # Cannot shoot at all this tick, so its done
+    @staticmethod
+    def decay(player: 'Player'):
+        # Decay health for buildings, faster on enemy territory
+        buildings = player.buildings
+        n = len(buildings)
+        buildings.health[:n] -= buildings.decay[:n]
+        buildings.despawn[:n] |= buildings.health[:n] <= 0
+
+    @staticmethod
+    def shoot(player: 'Player'):
+        # All buildings of the player fire at once at opponent units
+        buildings = player.buildings
+        units = player.opponent.units
+        n = len(buildings)
+        if n == 0 or len(units) == 0:
+            return
 
-        self.tick_counter = self.tick_speed
-        distance = math.hypot(self.x - unit.x, self.y - unit.y)
+        # Wait for reload (shooting speed)
+        tick_counter = buildings.tick_counter[:n]
+        tick_counter -= 1
+        ready = np.flatnonzero(tick_counter <= 0)
+        if ready.size == 0:
+            return
+        tick_counter[ready] = buildings.tick_speed[ready]
+
+        x = buildings.x[ready]
+        y = buildings.y[ready]
+        attack_range = buildings.attack_range[ready]
+
+        # Towers whose reach overlaps along x are grouped, and each group queries the cells covered by its reach.
+        # Groups cover disjoint columns, so no unit is found twice.
+        reach = attack_range.astype(np.int64)
+        order = np.argsort(x - reach, kind="stable")
+        x0 = (x - reach)[order]
+        x1 = np.maximum.accumulate((x + reach)[order])
+        split = np.flatnonzero(x0[1:] > x1[:-1]) + 1
+
+        cells = player.game.state.get_unit_cells(units)
+        if split.size == 0:
+            rows = cells.query(x0[0], (y - reach).min(), x1[-1], (y + reach).max())
+        else:
+            first = np.concatenate(([0], split))
+            last = np.concatenate((split - 1, [order.size - 1]))
+            y0 = np.minimum.reduceat((y - reach)[order], first)
+            y1 = np.maximum.reduceat((y + reach)[order], first)
+            rows = cells.query_many(x0[first], y0, x1[last], y1)
+
+        # Candidate units in table order
+        rows = np.sort(rows)
+        if rows.size == 0:
+            return
 
-        if self.attack.range >= distance:
-            # Can shoot
-            # Attack-dmg - min(0, (armor - attack_pen))
-            damage = random.randint(self.attack.min, self.attack.max) - min(0, unit.armor - self.attack.pen)
-            unit.damage(damage)
-            return True
+        # Building x unit distance matrix
+        distance = np.hypot(x[:, None] - units.x[rows], y[:, None] - units.y[rows])
+        in_range = distance <= attack_range[:, None]
+        shooting = np.flatnonzero(in_range.any(axis=1))
+        if shooting.size == 0:
+            return
+        in_range = in_range[shooting]
+
+        # Pick targets, ties go to the unit that spawned first
+        policy = player.game.config.mechanics.target_policy
+        if policy == "first":
+            target = np.argmax(in_range, axis=1)
+        elif policy == "closest":
+            target = np.argmin(np.where(in_range, distance[shooting], np.inf), axis=1)
+        else:
+            # lowest_health, the policy is validated by Config.Mechanics
+            target = np.argmin(np.where(in_range, units.health[rows], np.inf), axis=1)
+        target = rows[target]
 
-        return False
+        # Attack-dmg - min(0, (armor - attack_pen))
+        shooting = ready[shooting]
+        damage = player.game.random.integers(buildings.attack_min[shooting], buildings.attack_max[shooting] + 1)
+        damage = damage - np.minimum(0, units.armor[target] - buildings.attack_pen[shooting])
+        units.damage(target, damage)
 
 
 class BasicTower(Building):
     entity_type = Building
     id = 1
     name = "Basic-Tower"
-    icon_template = get_icon("sprites/buildings/tower_1.png")
+    icon_template = "sprites/buildings/tower_1.png"
     health = 100
     speed = 0
     armor = 0
@@ -237,7 +275,7 @@ class FastTower(Building):
     entity_type = Building
     id = 2
     name = "Fast-Tower"
-    icon_template = get_icon("sprites/buildings/tower_2.png")
+    icon_template = "sprites/buildings/tower_2.png"
     health = 100
     speed = 0
     armor = 0
@@ -257,7 +295,7 @@ class FasterTower(Building):
     entity_type = Building
     id = 3
     name = "Faster-Tower"
-    icon_template = get_icon("sprites/buildings/lazer_tower.png")
+    icon_template = "sprites/buildings/lazer_tower.png"
     health = 100
     speed = 0
     armor = 0
@@ -277,7 +315,7 @@ class Militia(Ground):
     entity_type = Ground
     id = 1
     name = "Militia"
-    icon_template = get_icon("sprites/units/militia.png")
+    icon_template = "sprites/units/militia.png"
     health = 40
     speed = 1
     armor = 2
@@ -291,7 +329,7 @@ class Footman(Ground):
     entity_type = Ground
     id = 2
     name = "Footman"
-    icon_template = get_icon("sprites/units/footman.png")
+    icon_template = "sprites/units/footman.png"
     health = 80
     speed = 1
     armor = 4
@@ -305,7 +343,7 @@ class Grunt(Ground):
     entity_type = Ground
     id = 3
     name = "Grunt"
-    icon_template = get_icon("sprites/units/grunt.png")
+    icon_template = "sprites/units/grunt.png"
     health = 140
     speed = 1
     armor = 4
@@ -319,7 +357,7 @@ class ArmoredGrunt(Ground):
     entity_type = Ground
     id = 4
     name = "Armored Grunt"
-    icon_template = get_icon("sprites/units/armored_grunt.png")
+    icon_template = "sprites/units/armored_grunt.png"
     health = 190
     speed = 1.2
     armor = 6
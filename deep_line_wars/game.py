@@ -1,21 +1,27 @@
 import uuid
+from collections import namedtuple
+
 import numpy as np
 
 from os.path import realpath, dirname, join
 
-import time
-
+from .action_space import ActionMask, StandardActionSpace, get_action_space
 from .config import Config
+from .gui import get_engine
 from .player import Player
+from .random_stream import RandomStream
+from .render_thread import RenderThread
 from .shop import Shop
 from .state import State
 
 dir_path = dirname(realpath(__file__))
 
+Snapshot = namedtuple("Snapshot", ["ticks", "winner", "selected_player", "state", "players", "random_state"])
+
 
 class Game:
 
-    def __init__(self, width, height, config: Config = None):
+    def __init__(self, width, height, config: Config = None, seed: int = None):
         # Create
         self.id = uuid.uuid4()
 
@@ -29,43 +35,128 @@ class Game:
         self.ticks = 0
         self.running = False
 
+        # Frame and tick rates over the last stat interval of a Scheduler, shown in the caption
+        self.frame_counter = 0
+        self.update_counter = 0
+
+        # Random numbers of this game only, seeded by the seed argument or else config.game.seed
+        self.random = RandomStream(seed if seed is not None else self.config.game.seed)
+
         self.state = State(self, width, height)
 
         self.winner = None
 
-        p1 = Player(1, self)
-        p2 = Player(2, self)
+        action_space = get_action_space(self.config.game.action_space)
+        p1 = Player(1, self, action_space)
+        p2 = Player(2, self, action_space)
         p1.opponent = p2
         p2.opponent = p1
         self.players = [p1, p2]
         self.selected_player = p1
 
-        self.gui = self.config.gui.engine(self)
+        # With a render thread the GUI draws a mirror of this game, from snapshots handed over by render()
+        self.renderer = RenderThread(self) if self.config.gui.render_thread else None
+        self.gui = self.renderer.gui if self.renderer else get_engine(self.config.gui.engine)(self)
         self.shop = Shop(self)
+        self.action_masks = ActionMask(self)
 
         self.ticks_per_second = self.config.mechanics.ticks_per_second
 
     def is_terminal(self):
         return True if self.winner else False
 
-    def step(self, action):
-        
+    def step(self, action, frame_skip: int = None):
+        # Performs the action, then advances frame_skip ticks (config.mechanics.frame_skip by default) and returns the
+        # observation after the last tick along with the reward summed over the ticks
+        frame_skip = frame_skip if frame_skip is not None else self.config.mechanics.frame_skip
+
         # Perform Action
         self.selected_player.action_space.perform(action)
 
-        # Update state
-        self.update()
+        reward = 0
+        terminal = False
+        for _ in range(frame_skip):
 
-        # Evaluate terminal state
-        terminal = self.is_terminal()
+            # Update state
+            self.update()
+
+            # Evaluate terminal state
+            terminal = self.is_terminal()
+
+            # Adjust reward according to terminal value
+            if terminal:
+                reward += -1 if self.winner != self.selected_player else 1
+                break
+            else:
+                reward += -1 if self.selected_player.health < self.selected_player.opponent.health else 0.001
 
-        # Adjust reward according to terminal value
-        if terminal:
-            reward = -1 if self.winner != self.selected_player else 1
-        else:
-            reward = -1 if self.selected_player.health < self.selected_player.opponent.health else 0.001
         return self.get_state(), reward, terminal, {}
 
+    def step_joint(self, actions, frame_skip: int = None):
+        """
+        Both players act in the same tick, player 1 performs actions[0] and player 2 actions[1], then frame_skip ticks
+        are advanced once for both. Returns the observations and summed rewards of player 1 and player 2, the
+        terminal flag and info. The selected player is left as it was.
+        """
+        frame_skip = frame_skip if frame_skip is not None else self.config.mechanics.frame_skip
+
+        # Actions are performed by the selected player, so each player is selected in turn
+        selected = self.selected_player
+        for player, action in zip(self.players, actions):
+            self.selected_player = player
+            player.action_space.perform(action)
+        self.selected_player = selected
+
+        rewards = [0, 0]
+        terminal = False
+        for _ in range(frame_skip):
+            self.update()
+            terminal = self.is_terminal()
+
+            for i, player in enumerate(self.players):
+                if terminal:
+                    rewards[i] += -1 if self.winner != player else 1
+                else:
+                    rewards[i] += -1 if player.health < player.opponent.health else 0.001
+            if terminal:
+                break
+
+        return self.get_joint_state(), tuple(rewards), terminal, {}
+
+    def get_joint_state(self):
+        """
+        Observations of player 1 and player 2. RAW states and frames drawn with draw_friendly do not depend on the
+        selected player, so the observation of the player that is not selected is a mirrored view of the other.
+        Otherwise the frame leaves out the units of the selected player and the other observation is rendered too,
+        with the other player selected for the time being.
+        """
+        gui = self.config.gui
+        if gui.state_representation == "RAW" or gui.draw_friendly:
+            state = self.get_state()
+            if gui.state_representation == "RAW" and gui.raw_layout == "channels_first":
+                mirrored = state[:, :, ::-1]
+            elif gui.state_representation == "RAW":
+                mirrored = state[:, ::-1]
+            else:
+                mirrored = state[::-1]
+            return (mirrored, state) if self.state.flipped else (state, mirrored)
+
+        def render_state():
+            # A frame of its own, not the most recent frame of a render thread or a view of the GUI buffer
+            if self.renderer:
+                self.render()
+                self.renderer.sync()
+                return self.renderer.get_state()
+            return np.array(self.get_state())
+
+        state = render_state()
+        self.flip_player()
+        try:
+            other = render_state()
+        finally:
+            self.flip_player()
+        return (other, state) if self.state.flipped else (state, other)
+
     def render_interval(self):
         return 1.0 / self.config.mechanics.fps if self.config.mechanics.fps > 0 else 0
 
@@ -81,7 +172,10 @@ class Game:
     def game_time(self):
         return self.ticks / self.ticks_per_second
 
-    def reset(self):
+    def reset(self, seed: int = None):
+        if seed is not None:
+            self.random.seed(seed)
+
         self.state.reset()
 
         for player in self.players:
@@ -96,25 +190,76 @@ class Game:
 
         return self.get_state()
 
-    def _get_raw_state(self, flip=False):
-        state = np.reshape(self.state.grid, (self.state.grid.shape[2], self.state.grid.shape[1], self.state.grid.shape[0]))
+    def snapshot(self):
+        """
+        Captures the simulation state so it can be rolled back with restore(). Only arrays and scalars are copied,
+        the GUI, agents and sprites are left out.
+        """
+        return Snapshot(
+            ticks=self.ticks,
+            winner=None if self.winner is None else self.players.index(self.winner),
+            selected_player=self.players.index(self.selected_player),
+            state=self.state.snapshot(),
+            players=tuple(player.snapshot() for player in self.players),
+            random_state=self.random.snapshot()
+        )
+
+    def restore(self, snapshot: Snapshot):
+        # Copies a snapshot back into the buffers of this game. The snapshot is left untouched and can be restored
+        # any number of times.
+        self.ticks = snapshot.ticks
+        self.winner = None if snapshot.winner is None else self.players[snapshot.winner]
+        self.selected_player = self.players[snapshot.selected_player]
+        self.state.restore(snapshot.state)
+        for player, player_snapshot in zip(self.players, snapshot.players):
+            player.restore(player_snapshot)
+        self.random.restore(snapshot.random_state)
+
+    def get_raw_state(self, flip=False, out=None):
+        """
+        The grid layers as an image in the layout of config.gui.raw_layout, mirrored along x when flip is set.
+        Without out this is a read-only view of the grid, valid until the game is next updated, otherwise the
+        observation is written into out and out is returned.
+        """
+        layout = self.config.gui.raw_layout
+        if layout == "channels_first":
+            state = self.state.grid.transpose(0, 2, 1)
+        elif layout == "channels_last":
+            state = self.state.grid.transpose(2, 1, 0)
+        else:
+            raise NotImplementedError("raw_layout must be channels_first or channels_last")
+
         if flip:
-            state = np.fliplr(state)
-        return state
+            state = state[:, :, ::-1] if layout == "channels_first" else state[:, ::-1]
 
-    def get_state(self):
+        if out is None:
+            state.flags.writeable = False
+            return state
+        np.copyto(out, state)
+        return out
 
+    def get_state(self, out=None):
+        # With out, the observation is written into it instead of a new array (or a view for RAW)
         if self.config.gui.state_representation == "RAW":
-            return self._get_raw_state(flip=self.flipped)
+            return self.get_raw_state(flip=self.state.flipped, out=out)
+        elif self.renderer:
+            # The most recent frame the render thread completed, which may lag behind the game
+            self.render()
+            return self.renderer.get_state(out=out)
         elif self.config.gui.state_representation == "RGB":
             self.render()
-            return self.gui.get_state(grayscale=False, flip=self.state.flipped)
+            state = self.gui.get_state(grayscale=False, flip=self.state.flipped)
         elif self.config.gui.state_representation == "L":
             self.render()
-            return self.gui.get_state(grayscale=True, flip=self.flipped)
+            state = self.gui.get_state(grayscale=True, flip=self.state.flipped)
         else:
             raise NotImplementedError("representation must be RAW, RGB, or L")
 
+        if out is None:
+            return state
+        np.copyto(out, state)
+        return out
+
     def update(self):
 
         if self.winner:
@@ -129,17 +274,43 @@ class Game:
                 self.winner = player.opponent
                 break
 
-        if self.config.mechanics.ups > 0:
-            time.sleep(self.update_interval())
+    def advance_until_decision(self, max_ticks: int):
+        """
+        Advances the game up to max_ticks ticks, stopping after the next tick in which anything happens (income, a
+        unit spawning or moving, a building firing or dying). Idle ticks in between only count down timers and are
+        skipped in one go, so the cost depends on the number of events instead of the number of ticks.
+        Returns the number of ticks advanced.
+        """
+        if self.winner or max_ticks <= 0:
+            return 0
+
+        idle = min(min(player.idle_ticks() for player in self.players), max_ticks)
+        if idle:
+            self.ticks += idle
+            for player in self.players:
+                player.skip(idle)
+
+        if idle < max_ticks:
+            self.update()
+            return idle + 1
+        return idle
 
     def render(self):
+        if self.renderer:
+            self.renderer.render(self)
+            return
         self.gui.event()
         self.gui.draw()
 
     def render_window(self):
+        if self.renderer:
+            self.renderer.render_window()
+            return
         self.gui.draw_screen()
 
     def quit(self):
+        if self.renderer:
+            self.renderer.close()
         self.gui.quit()
 
     def caption(self):
@@ -151,3 +322,10 @@ class Game:
 
     def get_action_space(self):
         return self.selected_player.action_space.size
+
+    def action_mask(self, player: 'Player' = None):
+        # Read-only boolean vector of the actions that are not a no-op for the player (the selected player by default)
+        player = player if player else self.selected_player
+        if isinstance(player.action_space, StandardActionSpace):
+            return self.action_masks.get(player)
+        return player.action_space.mask(player)
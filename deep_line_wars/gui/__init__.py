@@ -0,0 +1,13 @@
+import importlib
+
+
+def get_engine(engine):
+    # Engines are GUI classes, or the name of a module in this package which is imported on first use
+    if isinstance(engine, str):
+        return importlib.import_module("%s.%s" % (__name__, engine)).GUI
+    return engine
+
+
+def caption(game):
+    # Window caption shared by the engines, with the frame and tick rates reported by the Scheduler
+    return "%s - DeepLineWars v1.0 [%sfps|%sups]" % (game.id, game.frame_counter, game.update_counter)
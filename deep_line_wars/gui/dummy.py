@@ -1,10 +1,13 @@
+from . import caption
+
+
 
 class GUI:
     def __init__(self, game):
         self.game = game
 
     def caption(self):
-        print("%s - DeepLineWars v1.0 [%sfps|%sups]" % (self.game.id, self.game.frame_counter, self.game.update_counter))
+        print(caption(self.game))
 
     def event(self):
         pass
@@ -16,7 +19,7 @@ class GUI:
         pass
 
     def get_state(self, grayscale=False, flip=False):
-        return self.game._get_raw_state()
+        return self.game.get_raw_state(flip=flip)
 
     def draw_screen(self):
         pass
@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 
+from . import caption
+
 
 class GUI:
 
@@ -14,7 +16,7 @@ class GUI:
         }
         self.tile_size = 32
 
-        self.config_draw_friendly = self.game.config.gui_draw_friendly
+        self.config_draw_friendly = self.game.config.gui.draw_friendly
         self.canvas = np.zeros((
             self.game.width * self.tile_size,
             self.game.height * self.tile_size,
@@ -22,12 +24,18 @@ class GUI:
         ), dtype=np.uint8)
 
     def caption(self):
-        print(
-            "%s - DeepLineWars v1.0 [%sfps|%sups]" % (self.game.id, self.game.frame_counter, self.game.update_counter))
+        print(caption(self.game))
 
     def event(self):
         pass
 
+    def blit(self, icon, x, y):
+        # Copies the icon to (x, y), clipped to the canvas like a surface blit
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + icon.shape[0], self.canvas.shape[0]), min(y + icon.shape[1], self.canvas.shape[1])
+        if x0 < x1 and y0 < y1:
+            self.canvas[x0:x1, y0:y1] = icon[x0 - x:x1 - x, y0 - y:y1 - y]
+
     def get_health_color(self, n):
         R = (255 * n)
         G = (255 * (1 - n))
@@ -51,7 +59,7 @@ class GUI:
             player.spawn_x * self.tile_size:(player.spawn_x * self.tile_size) + self.tile_size,
             0:self.game.height * self.tile_size] = self.tile_colors[1]
 
-        for center in self.game.center_area:
+        for center in self.game.state.center_area:
             c = center * self.tile_size
 
             self.canvas[
@@ -65,22 +73,26 @@ class GUI:
                 if self.game.selected_player == player:
                     continue
 
-            for unit in player.units:
-                x = int((unit.x * 32) + (32 * (1 - (unit.tick_counter / unit.tick_speed))) * unit.player.direction)
-                y = int((unit.y * 32))
+            units = player.units.view()
+            for type_id, unit_x, unit_y, tick_counter, tick_speed in zip(
+                    units.type_id, units.x, units.y, units.tick_counter, units.tick_speed):
+                x = unit_x * 32
+                if tick_speed > 0:
+                    x += (32 * (1 - (tick_counter / tick_speed))) * player.direction
+                x = int(x)
+                y = int((unit_y * 32))
 
-                self.canvas[
-                x:x + self.tile_size,
-                y:y + self.tile_size] = unit.icon_image
+                self.blit(player.units.types[type_id].get_icon(player), x, y)
 
         # Draw Buildings
         for player in self.game.players:
-            for building in player.buildings:
-                x = int(building.x * self.tile_size)
-                y = int(building.y * self.tile_size)
+            buildings = player.buildings.view()
+            for type_id, building_x, building_y in zip(buildings.type_id, buildings.x, buildings.y):
+                x = int(building_x * self.tile_size)
+                y = int(building_y * self.tile_size)
                 self.canvas[
                 x:x + self.tile_size,
-                y:y + self.tile_size] = building.icon_image
+                y:y + self.tile_size] = player.buildings.types[type_id].get_icon(player)
 
         # Player cursors
         for player in self.game.players:
@@ -97,10 +109,10 @@ class GUI:
     def get_state(self, grayscale=False, flip=False):
         image = np.array(self.canvas)
         if grayscale:
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
 
         if flip:
-            image = cv2.flip(image, 1)
+            image = cv2.flip(image, 0)
 
         return image
 
@@ -1,6 +1,8 @@
 import pygame
 import numpy as np
-import cv2
+
+from . import caption
+from .raster import gray
 
 
 class TopSurface(pygame.Surface):
@@ -71,12 +73,23 @@ class GameSurface(pygame.Surface):
 
         self.config_draw_friendly = self.game.config.gui.draw_friendly
 
+        # Sprite surfaces by (entity type, player id)
+        self.sprites = {}
+
+        # Sprites and cursors drawn in the last frame, as (surface or color, rect) in drawing order, the territory
+        # colors they were drawn over and the regions redrawn by the last draw
+        self.drawn = []
+        self.territory_colors = None
+        self.dirty = []
+        self.dirty_rects = []
+
         # Create Static map parts (Mid + goal)
         self.goal_mid = pygame.Surface((self.game.width * 32, self.game.height * 32))
 
         for (x, y, v) in self.game.state.static_tiles:
             pygame.draw.rect(self.goal_mid, self.tiles[v], (x * 32, y * 32, 32, 32))
-        self.goal_mid = self.goal_mid.convert()
+        if pygame.display.get_surface() is not None:
+            self.goal_mid = self.goal_mid.convert()
 
 
 
@@ -88,59 +101,103 @@ class GameSurface(pygame.Surface):
         return R, G, B
 
     def draw_map(self):
-        # Draw Z = 0 - Environmental Layer
+        # Draw Z = 0 - Environmental Layer, territories change color with the health of their player
+        colors = []
         for player in self.game.players:
             health_percent = 1 - max(0, player.health / self.game.config.mechanics.start_health)
-            color = self.get_health_color(health_percent)
-
-            pygame.draw.rect(self.goal_mid, color, player.territory)
-
-        self.blit(self.goal_mid, (0, 0))
-
-    def draw_units(self):
+            colors.append(self.get_health_color(health_percent))
+
+        if colors != self.territory_colors:
+            for player, color in zip(self.game.players, colors):
+                pygame.draw.rect(self.goal_mid, color, player.territory)
+                self.dirty.append(pygame.Rect(player.territory))
+
+            if self.territory_colors is None:
+                self.dirty.append(self.get_rect())
+            self.territory_colors = colors
+
+    def get_sprite(self, cls, player):
+        # Surface of the outlined icon, made once per entity type and player
+        sprite = self.sprites.get((cls, player.id))
+        if sprite is None:
+            sprite = pygame.surfarray.make_surface(cls.get_icon(player))
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert()
+            self.sprites[(cls, player.id)] = sprite
+        return sprite
+
+    def draw_units(self, items):
         # Get all units on map
         for player in self.game.players:
 
             if not self.config_draw_friendly:
-                if self.game.gui.surface_interaction.selected_player == player:
+                if self.game.selected_player == player:
                     continue
 
-            for unit in player.units:
-
-                pos_x = (unit.x * 32)
-                pos_y = (unit.y * 32)
-                if unit.speed > 0:
-                    pos_x += (32 * (1 - (unit.tick_counter / unit.tick_speed))) * unit.player.direction
+            units = player.units.view()
+            for type_id, x, y, tick_counter, tick_speed in zip(
+                    units.type_id, units.x, units.y, units.tick_counter, units.tick_speed):
 
-                position = (pos_x, pos_y, 32, 32)
+                pos_x = (x * 32)
+                pos_y = (y * 32)
+                if tick_speed > 0:
+                    pos_x += (32 * (1 - (tick_counter / tick_speed))) * player.direction
 
-                self.blit(pygame.surfarray.make_surface(unit.icon_image), position)
-                #pygame.draw.rect(self, player.player_color, position, 2)   # Outline Effect
+                position = (int(pos_x), int(pos_y), 32, 32)
+                items.append((self.get_sprite(player.units.types[type_id], player), position))
 
-    def draw_buildings(self):
+    def draw_buildings(self, items):
         # Get all units on map
         for player in self.game.players:
-            for building in player.buildings:
+            buildings = player.buildings.view()
+            for type_id, x, y in zip(buildings.type_id, buildings.x, buildings.y):
 
-                pos_x = building.x * 32
-                pos_y = building.y * 32
-                position = (pos_x, pos_y, 32, 32)
+                pos_x = x * 32
+                pos_y = y * 32
+                position = (int(pos_x), int(pos_y), 32, 32)
+                items.append((self.get_sprite(player.buildings.types[type_id], player), position))
 
-                self.blit(pygame.surfarray.make_surface(building.icon_image), position)
-                #pygame.draw.rect(self, player.player_color, position, 2)   # Outline Effect
-
-    def draw_cursor(self):
+    def draw_cursor(self, items):
         for player in self.game.players:
-            pygame.draw.rect(self, player.cursor_colors, [
-                player.virtual_cursor_x * 32,(player.virtual_cursor_y * 32), 32, 32
-            ])
+            items.append((player.cursor_colors, (player.virtual_cursor_x * 32, (player.virtual_cursor_y * 32), 32, 32)))
 
     def draw(self):
         #self.fill((0, 0, 0))
         self.draw_map()
-        self.draw_units()
-        self.draw_buildings()
-        self.draw_cursor()
+
+        items = []
+        self.draw_units(items)
+        self.draw_buildings(items)
+        self.draw_cursor(items)
+
+        # Regions where a sprite or cursor appeared, moved or disappeared since the last frame
+        changed = set(self.drawn).symmetric_difference(items)
+        self.dirty.extend(pygame.Rect(position) for _, position in changed)
+        self.dirty_rects = [pygame.Rect(rect) for rect in {tuple(rect) for rect in self.dirty}]
+        self.dirty = []
+        self.drawn = items
+
+        # Redraw the background and everything over it in the dirty regions only, in drawing order. When much of the
+        # surface is dirty it is cheaper to redraw all of it at once
+        if sum(rect.w * rect.h for rect in self.dirty_rects) * 4 > self.get_width() * self.get_height():
+            self.dirty_rects = [self.get_rect()]
+            self.blit(self.goal_mid, (0, 0))
+            self.blits([item for item in items if isinstance(item[0], pygame.Surface)], doreturn=False)
+            for image, position in items[len(items) - len(self.game.players):]:
+                pygame.draw.rect(self, image, position)
+            return
+
+        rects = [position for _, position in items]
+        for dirty in self.dirty_rects:
+            self.set_clip(dirty)
+            self.blit(self.goal_mid, dirty, dirty)
+            for i in dirty.collidelistall(rects):
+                image, position = items[i]
+                if isinstance(image, pygame.Surface):
+                    self.blit(image, position)
+                else:
+                    pygame.draw.rect(self, image, position)
+        self.set_clip(None)
 
 
 class InteractionSurface(pygame.Surface):
@@ -238,11 +295,20 @@ class InteractionSurface(pygame.Surface):
 class GUI:
 
     def __init__(self, game):
-        pygame.init()
+        # Offscreen the display is never initialized, frames are drawn into a NumPy buffer
+        self.offscreen = game.config.gui.offscreen
+        if self.offscreen:
+            pygame.font.init()
+        else:
+            pygame.init()
 
         # Game variables
         self.game = game
 
+        # Keyboard and mouse input acts on self.game, turned off by a RenderThread since it attaches the GUI to a
+        # mirror of the game. Window events are handled either way
+        self.input = True
+
         #self.minimal = game.config.gui.minimal
         self.minimal = True
 
@@ -273,15 +339,22 @@ class GUI:
         self.plot_surface_y = self.stat_panel_height + self.game_grid_height + self.bot_panel_height
 
         # PYGame variables
-        self.screen = pygame.display.set_mode((self.game_width, self.game_height))
-        self.background = pygame.Surface(self.screen.get_size())
-        self.background = self.background.convert()
+        if self.offscreen:
+            # The screen is a surface over a row-major RGBX buffer
+            self.buffer = np.zeros((self.game_height, self.game_width, 4), dtype=np.uint8)
+            self.screen = pygame.image.frombuffer(self.buffer, (self.game_width, self.game_height), "RGBX")
+            self.background = pygame.Surface(self.screen.get_size())
+        else:
+            self.screen = pygame.display.set_mode((self.game_width, self.game_height))
+            self.background = pygame.Surface(self.screen.get_size())
+            self.background = self.background.convert()
         self.background.fill((0, 0, 0))
 
         # [Surface] Game Area
         self.game_surface = pygame.Surface((self.game_width, self.game_grid_height))
 
-        pygame.display.set_caption("DeepLineWars v1.0")
+        if not self.offscreen:
+            pygame.display.set_caption("DeepLineWars v1.0")
 
         self.surface_top_h = 55
         self.surface_game_h = self.game.height * self.game.config.game.tile_height
@@ -301,24 +374,47 @@ class GUI:
         if self.minimal:
             self.surface_game_y = 0
 
-        self.i = 0
+        # Read-only views of the game area of the offscreen buffer, rows first (height, width, 3) and columns first
+        # (width, height, 3) like the states of the other engines. pixels keeps the padding byte so the rows stay
+        # contiguous for grayscale conversion
+        self.pixels = None
+        self.image = None
+        self.frame = None
+        if self.offscreen:
+            self.pixels = self.buffer[self.surface_game_y:self.surface_game_y + self.game_grid_height]
+            self.pixels.flags.writeable = False
+            self.image = self.pixels[:, :, :3]
+            self.frame = self.image.transpose(1, 0, 2)
+
+        self.screen_dirty = []
 
-    def get_state(self, grayscale=False, flip=False):
-        image = np.array(pygame.surfarray.pixels3d(self.surface_game))
+        self.i = 0
 
-        if grayscale:
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    def get_state(self, grayscale=False, flip=False, out=None):
+        # Offscreen, RGB states are read-only views of the frame buffer, valid until the next draw. With out, the
+        # state is copied into out instead
+        if self.offscreen:
+            image = gray(self.pixels).T if grayscale else self.frame
+        else:
+            image = pygame.surfarray.pixels3d(self.surface_game)
+            if grayscale:
+                image = gray(image)
 
         if flip:
-            image = cv2.flip(image, 0)
+            image = image[::-1]
 
-        return image
+        if out is not None:
+            np.copyto(out, image)
+            return out
+        return image if self.offscreen else np.array(image)
 
     def player(self):
         return self.game.players[self.selected_player]
 
     def caption(self):
-        pygame.display.set_caption("DeepLineWars v1.0 [%sfps|%sups]" % (self.game.frame_counter, self.game.update_counter))
+        if self.offscreen:
+            return
+        pygame.display.set_caption(caption(self.game))
 
     def draw_level_up(self):
         pygame.draw.rect(self.screen, (0, 255, 255), self.btn_level_up)
@@ -343,7 +439,12 @@ class GUI:
     def draw(self):
 
         self.surface_game.draw()
-        self.screen.blit(self.surface_game, (0, self.surface_game_y))
+        for rect in self.surface_game.dirty_rects:
+            self.screen.blit(self.surface_game, rect.move(0, self.surface_game_y), rect)
+            self.screen_dirty.append(rect.move(0, self.surface_game_y))
+        if len(self.screen_dirty) > 256:
+            # The window has not been updated for many draws
+            self.screen_dirty = [self.screen.get_rect()]
 
         if not self.minimal:
             self.surface_top.draw()
@@ -356,13 +457,24 @@ class GUI:
             self.screen.blit(self.surface_plot, (0, self.surface_plot_y))
 
     def draw_screen(self):
-        pygame.display.flip()
+        # Regions of the screen redrawn since the window was last updated, by any number of draws
+        screen_dirty, self.screen_dirty = self.screen_dirty, []
+        if self.offscreen:
+            return
+        elif self.minimal:
+            pygame.display.update(screen_dirty)
+        else:
+            pygame.display.flip()
 
     def quit(self):
         pygame.display.quit()
         pygame.quit()
 
     def event(self):
+        # There are no input events without a display
+        if self.offscreen:
+            return
+
         keybind_units = [
             pygame.K_1, pygame.K_2,
             pygame.K_3, pygame.K_4, pygame.K_5,
@@ -374,6 +486,9 @@ class GUI:
             if event.type == pygame.QUIT:
                 self.game.running = False
 
+            if not self.input:
+                continue
+
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_s:
                     self.player().spawn(self.selected_unit_type)
@@ -0,0 +1,256 @@
+import numpy as np
+
+from . import caption
+
+
+def gray(image):
+    # Fixed point RGB (or RGBX) to gray, the same as cv2.COLOR_RGB2GRAY. Contiguous images are converted by cv2 when
+    # it is installed, strided views are summed per channel in uint32 instead of being copied first (an integer matmul
+    # does not go through BLAS and is an order of magnitude slower than either)
+    if image.flags.c_contiguous:
+        try:
+            import cv2
+        except ImportError:
+            pass
+        else:
+            code = cv2.COLOR_RGB2GRAY if image.shape[-1] == 3 else cv2.COLOR_RGBA2GRAY
+            return cv2.cvtColor(image.reshape(-1, image.shape[-2], image.shape[-1]), code).reshape(image.shape[:-1])
+
+    r, g, b = (image[..., i].astype(np.uint32) * weight for i, weight in enumerate(GUI.GRAY_WEIGHTS.astype(np.uint32)))
+    return ((r + g + b + (1 << 14)) >> 15).astype(np.uint8)
+
+
+class GUI:
+    """
+    Headless renderer that draws the frame with array operations only.
+
+    Renders the same frames as the opencv engine. Sprites are kept in an atlas of outlined icons and every unit,
+    building and cursor is a 32 pixel wide strip per tile row. The strip drawn last owns each pixel column of a tile
+    row, which is resolved with np.maximum.at, and then all owned columns are gathered from the atlas in one indexing
+    operation.
+
+    With config.gui.resolution set, states are drawn at that size instead. Every output pixel samples the nearest
+    pixel of the full size frame (as cv2.INTER_NEAREST would), through index maps computed once, so the full frame
+    is never drawn. Grayscale states are gathered from a grayscale atlas and background, without an RGB frame.
+    """
+
+    # Fixed point RGB to gray weights, the same as cv2.COLOR_RGB2GRAY
+    GRAY_WEIGHTS = np.array([9798, 19235, 3735], dtype=np.int32)
+
+    def __init__(self, game):
+        self.game = game
+        self.tile_colors = {
+            0: (0, 123, 12),  # Grass
+            1: (255, 20, 147),  # Goal / Hot zone
+            2: (0, 128, 255),  # Mid Zone
+            3: (0, 255, 255)
+        }
+        self.tile_size = 32
+
+        self.config_draw_friendly = self.game.config.gui.draw_friendly
+        self.canvas = np.zeros((
+            self.game.width * self.tile_size,
+            self.game.height * self.tile_size,
+            3
+        ), dtype=np.uint8)
+
+        # The canvas as one run of tile_size pixels per pixel column and tile row, which is what sprites are copied in
+        self.canvas_runs = self.canvas.reshape(self.canvas.shape[0], self.game.height, self.tile_size * 3)
+
+        # Background, redrawn only when the health of a player changes
+        self.background = np.zeros_like(self.canvas)
+        self.background_health = None
+
+        # Sprite atlas, indexed by (kind, player id, type id) for icons and (cursor, player id) for cursors
+        self.atlas = np.zeros((0, self.tile_size, self.tile_size, 3), dtype=np.uint8)
+        self.atlas_index = {}
+
+        # Atlas index by type id for the units and buildings of each player, -1 until the icon is added
+        self.type_index = {}
+
+        self.atlas_gray = np.zeros(self.atlas.shape[:3], dtype=np.uint8)
+
+        self.strip = np.arange(self.tile_size)
+
+        # Output pixel to full size pixel maps when drawing at a given resolution
+        self.resolution = self.game.config.gui.resolution
+        if self.resolution:
+            width, height = self.resolution
+            self.sample_x = self.nearest(width, self.canvas.shape[0])
+            sample_y = self.nearest(height, self.canvas.shape[1])
+            self.sample_row = sample_y // self.tile_size
+            self.sample_local = sample_y % self.tile_size
+            self.frame = np.zeros((width, height, 3), dtype=np.uint8)
+            self.frame_gray = np.zeros((width, height), dtype=np.uint8)
+            self.background_sampled = None
+            self.background_sampled_gray = None
+            self.frame_plan = None
+            self.frames_drawn = set()  # Grayscale flags of the frames gathered since the last draw
+
+    def caption(self):
+        print(caption(self.game))
+
+    def event(self):
+        pass
+
+    def get_health_color(self, n):
+        R = (255 * n)
+        G = (255 * (1 - n))
+        B = 0
+        return R, G, B
+
+    @staticmethod
+    def nearest(size, full_size):
+        # Full size pixel sampled by each output pixel, computed in floating point like cv2.INTER_NEAREST
+        return np.minimum(np.floor(np.arange(size) * (1. / (size / full_size))).astype(np.int64), full_size - 1)
+
+    def sprite(self, key, image):
+        # Atlas index of a sprite, added on first use
+        index = self.atlas_index.get(key)
+        if index is None:
+            index = self.atlas_index[key] = len(self.atlas)
+            self.atlas = np.concatenate([self.atlas, np.broadcast_to(image, self.atlas.shape[1:])[None]])
+            self.atlas_gray = np.concatenate([self.atlas_gray, gray(self.atlas[-1:])])
+        return index
+
+    def icons(self, kind, player, table, type_id):
+        # Atlas indices of the icons of a unit or building table
+        lookup = self.type_index.get((kind, player.id))
+        if lookup is None:
+            lookup = self.type_index[(kind, player.id)] = np.full(np.iinfo(np.int8).max + 1, -1, dtype=np.int64)
+
+        index = lookup[type_id]
+        if (index < 0).any():
+            for t in np.unique(type_id[index < 0]).tolist():
+                lookup[t] = self.sprite((kind, player.id, t), table.types[t].get_icon(player))
+            index = lookup[type_id]
+        return index
+
+    def draw_background(self):
+        health = tuple(player.health for player in self.game.players)
+        if health == self.background_health:
+            return
+        self.background_health = health
+
+        for player in self.game.players:
+            health_percent = 1 - max(0, player.health / self.game.config.mechanics.start_health)
+            color = self.get_health_color(health_percent)
+
+            self.background[
+            player.territory[0]:player.territory[0] + player.territory[2],
+            player.territory[1]:player.territory[1] + player.territory[3]] = color
+
+            self.background[
+            player.spawn_x * self.tile_size:(player.spawn_x * self.tile_size) + self.tile_size,
+            0:self.game.height * self.tile_size] = self.tile_colors[1]
+
+        for center in self.game.state.center_area:
+            c = center * self.tile_size
+
+            self.background[
+            c:c + self.tile_size,
+            0:self.game.height * self.tile_size] = self.tile_colors[2]
+
+        if self.resolution:
+            self.background_sampled = self.background[self.sample_x][:, self.sample_row * self.tile_size + self.sample_local]
+            self.background_sampled_gray = gray(self.background_sampled)
+
+    def sprites(self):
+        # Pixel x, tile row and atlas index of everything drawn over the background, in drawing order
+        x, row, index = [], [], []
+
+        for player in self.game.players:
+
+            if not self.config_draw_friendly:
+                if self.game.selected_player == player:
+                    continue
+
+            units = player.units
+            n = len(units)
+            if n:
+                # Units are drawn between tiles while they wait to move on
+                tick_counter, tick_speed = units.tick_counter[:n], units.tick_speed[:n]
+                offset = np.zeros(n)
+                moving = tick_speed > 0
+                offset[moving] = (32 * (1 - (tick_counter[moving] / tick_speed[moving]))) * player.direction
+                x.append((units.x[:n] * 32 + offset).astype(np.int64))
+                row.append(units.y[:n])
+                index.append(self.icons("units", player, units, units.type_id[:n]))
+
+        for player in self.game.players:
+            buildings = player.buildings
+            n = len(buildings)
+            if n:
+                x.append(buildings.x[:n] * self.tile_size)
+                row.append(buildings.y[:n])
+                index.append(self.icons("buildings", player, buildings, buildings.type_id[:n]))
+
+        # Player cursors
+        for player in self.game.players:
+            x.append(np.array([player.virtual_cursor_x * self.tile_size], dtype=np.int64))
+            row.append(np.array([player.virtual_cursor_y], dtype=np.int64))
+            index.append(np.array([
+                self.sprite(("cursor", player.id), np.array(player.cursor_colors, dtype=np.uint8))
+            ], dtype=np.int64))
+
+        return np.concatenate(x), np.concatenate(row), np.concatenate(index)
+
+    def draw(self, ignore=False):
+        if ignore:
+            return False
+
+        self.draw_background()
+        x, row, index = self.sprites()
+
+        # Pixel columns covered by each sprite strip, clipped to the canvas
+        columns = x[:, None] + self.strip
+        order = np.broadcast_to(np.arange(len(x))[:, None], columns.shape)
+        rows = np.broadcast_to(row[:, None], columns.shape)
+        inside = (columns >= 0) & (columns < self.canvas.shape[0])
+
+        # The last sprite drawn over a pixel column of a tile row is the one that shows
+        owner = np.full((self.canvas.shape[0], self.game.height), -1, dtype=np.int64)
+        np.maximum.at(owner, (columns[inside], rows[inside]), order[inside])
+
+        if self.resolution:
+            # Sprite pixel shown at each output pixel, the frame itself is gathered by get_state
+            owner = owner[self.sample_x][:, self.sample_row]
+            px, py = np.nonzero(owner >= 0)
+            sprite = owner[px, py]
+            self.frame_plan = (px, py, index[sprite], self.sample_x[px] - x[sprite], self.sample_local[py])
+            self.frames_drawn.clear()
+            return
+
+        np.copyto(self.canvas, self.background)
+        px, ty = np.nonzero(owner >= 0)
+        sprite = owner[px, ty]
+        atlas_runs = self.atlas.reshape(len(self.atlas), self.tile_size, self.tile_size * 3)
+        self.canvas_runs[px, ty] = atlas_runs[index[sprite], px - x[sprite]]
+
+    def draw_frame(self, grayscale):
+        # Gathers the output frame of the last draw from the atlas, in RGB or grayscale
+        frame, background, atlas = (self.frame_gray, self.background_sampled_gray, self.atlas_gray) if grayscale \
+            else (self.frame, self.background_sampled, self.atlas)
+        if grayscale not in self.frames_drawn:
+            px, py, sprite, sprite_x, sprite_y = self.frame_plan
+            np.copyto(frame, background)
+            frame[px, py] = atlas[sprite, sprite_x, sprite_y]
+            self.frames_drawn.add(grayscale)
+        return frame
+
+    def quit(self):
+        pass
+
+    def get_state(self, grayscale=False, flip=False):
+        if self.resolution:
+            image = self.draw_frame(grayscale)
+        else:
+            image = gray(self.canvas) if grayscale else self.canvas
+
+        if flip:
+            image = image[::-1]
+
+        return np.array(image)
+
+    def draw_screen(self):
+        pass
@@ -0,0 +1,220 @@
+import copy
+import math
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+from .action_space import StandardActionSpace
+from .config import Config
+
+NO_ACTION = StandardActionSpace.action_names().index("no_action")
+
+
+def random_policy(game, rng: random.Random):
+    return rng.randrange(game.get_action_space())
+
+
+def passive_policy(game, rng: random.Random):
+    return NO_ACTION
+
+
+class Node:
+
+    def __init__(self, actions, rng: random.Random):
+        self.children = {}
+        self.untried = list(range(actions))
+        rng.shuffle(self.untried)
+        self.visits = 0
+        self.value = 0.0
+
+    def select(self, exploration):
+        # UCT over the expanded children
+        log_visits = math.log(self.visits)
+        return max(
+            self.children.items(),
+            key=lambda item: item[1].value / item[1].visits + exploration * math.sqrt(log_visits / item[1].visits)
+        )
+
+
+class Search:
+    """
+    Open-loop Monte Carlo Tree Search for the selected player of a headless search game.
+
+    Every iteration restores the root snapshot into the same game and replays the actions of the tree path, so no game
+    is ever built or copied during search. The opponent is not part of the tree, it moves with opponent_policy after
+    each action of the searching player, the same way players alternate in Game.step().
+    """
+
+    def __init__(self, game, rollout_policy=random_policy, opponent_policy=random_policy, max_depth=50,
+                 exploration=1.4):
+        self.game = game
+        self.rollout_policy = rollout_policy
+        self.opponent_policy = opponent_policy
+        self.max_depth = max_depth
+        self.exploration = exploration
+        self.rng = random.Random()
+
+    def play(self, action):
+        game = self.game
+        game.selected_player.action_space.perform(action)
+        game.update()
+        game.flip_player()
+        if not game.winner:
+            game.selected_player.action_space.perform(self.opponent_policy(game, self.rng))
+            game.update()
+        game.flip_player()
+
+    def evaluate(self, player):
+        # 1 for a win, -1 for a loss and the health difference for unfinished games
+        if self.game.winner:
+            return 1.0 if self.game.winner is player else -1.0
+        start_health = self.game.config.mechanics.start_health
+        return max(-1.0, min(1.0, (player.health - player.opponent.health) / start_health))
+
+    def run(self, snapshot, iterations=None, time_limit=None, seed=None):
+        # Searches from the snapshot and returns the visit count and total value of each root action
+        game = self.game
+        self.rng.seed(seed)
+        actions = game.get_action_space()
+        root = Node(actions, self.rng)
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+        iteration = 0
+        while (iterations is None or iteration < iterations) and (deadline is None or time.perf_counter() < deadline):
+            iteration += 1
+            game.restore(snapshot)
+            player = game.selected_player
+
+            # Fresh chance events for every iteration
+            game.random.seed(self.rng.getrandbits(64))
+
+            # Selection
+            node = root
+            path = [root]
+            depth = 0
+            while not node.untried and node.children and not game.winner:
+                action, node = node.select(self.exploration)
+                self.play(action)
+                path.append(node)
+                depth += 1
+
+            # Expansion
+            if node.untried and not game.winner:
+                action = node.untried.pop()
+                node.children[action] = Node(actions, self.rng)
+                node = node.children[action]
+                self.play(action)
+                path.append(node)
+                depth += 1
+
+            # Rollout
+            while depth < self.max_depth and not game.winner:
+                self.play(self.rollout_policy(game, self.rng))
+                depth += 1
+
+            # Backpropagation
+            value = self.evaluate(player)
+            for node in path:
+                node.visits += 1
+                node.value += value
+
+        visits = np.zeros(actions, dtype=np.int64)
+        values = np.zeros(actions, dtype=np.float64)
+        for action, child in root.children.items():
+            visits[action] = child.visits
+            values[action] = child.value
+        return visits, values
+
+
+def search_game(width, height, config: Config):
+    # Headless copy of a game setup for searching, without rendering or update throttling
+    from .game import Game
+
+    mechanics = copy.copy(config.mechanics)
+    mechanics.ups = -1
+    mechanics.fps = -1
+    return Game(width, height, Config(
+        game=config.game,
+        mechanics=mechanics,
+        gui=Config.GUI(engine="dummy", state_representation="RAW"),
+        map=config.map
+    ))
+
+
+_worker = None
+
+
+def _worker_init(width, height, config, options):
+    global _worker
+    _worker = Search(search_game(width, height, config), **options)
+
+
+def _worker_run(args):
+    return _worker.run(*args)
+
+
+class MCTS:
+    """
+    Monte Carlo Tree Search planner over the StandardActionSpace of the selected player.
+
+    Search runs on a private headless game, the game being planned for is only read through snapshot(). The budget is
+    a number of iterations, a time limit in seconds, or both. With processes > 1 the search is root parallel, every
+    worker grows its own tree with a share of the iterations (or the full time limit) and the root statistics are
+    summed.
+    """
+
+    def __init__(self, game, iterations=200, time_limit=None, rollout_policy=random_policy,
+                 opponent_policy=random_policy, max_depth=50, exploration=1.4, processes=1, seed=None):
+        if iterations is None and time_limit is None:
+            raise ValueError("MCTS needs an iteration budget, a time limit or both")
+
+        self.game = game
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.processes = processes
+        self.rng = random.Random(seed)
+
+        # Root statistics of the last search
+        self.visits = None
+        self.values = None
+
+        options = dict(
+            rollout_policy=rollout_policy,
+            opponent_policy=opponent_policy,
+            max_depth=max_depth,
+            exploration=exploration
+        )
+        if processes > 1:
+            self.search = None
+            self.pool = multiprocessing.Pool(
+                processes, initializer=_worker_init, initargs=(game.width, game.height, game.config, options)
+            )
+        else:
+            self.search = Search(search_game(game.width, game.height, game.config), **options)
+            self.pool = None
+
+    def plan(self):
+        # Searches from the current position and returns the most visited action
+        snapshot = self.game.snapshot()
+
+        if self.pool:
+            iterations = None if self.iterations is None else -(-self.iterations // self.processes)
+            results = self.pool.map(_worker_run, [
+                (snapshot, iterations, self.time_limit, self.rng.getrandbits(32)) for _ in range(self.processes)
+            ])
+            self.visits = sum(visits for visits, _ in results)
+            self.values = sum(values for _, values in results)
+        else:
+            self.visits, self.values = self.search.run(
+                snapshot, self.iterations, self.time_limit, self.rng.getrandbits(32)
+            )
+
+        return int(np.argmax(self.visits))
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
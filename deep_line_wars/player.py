@@ -3,6 +3,8 @@ import numpy as np
 from os.path import realpath, dirname
 
 from deep_line_wars import action_space
+from deep_line_wars.entity import Ground, Building
+from deep_line_wars.unit_table import UnitTable, BuildingTable
 
 dir_path = dirname(realpath(__file__))
 
@@ -76,8 +78,8 @@ class Player:
         self.income = None
         self.level = None
 
-        self.units = None
-        self.buildings = None
+        self.units = UnitTable(self)
+        self.buildings = BuildingTable(self)
         self.spawn_queue = None
 
         self.stat_spawn_counter = None
@@ -95,14 +97,30 @@ class Player:
         self.lumber = self.game.config.mechanics.start_lumber
         self.income = self.game.config.mechanics.start_income
         self.level = 0
-        self.units = []
-        self.buildings = []
+        self.units.clear()
+        self.buildings.clear()
         self.spawn_queue = []
         self.stat_spawn_counter = 0
         self.income_counter = self.income_frequency
         self.virtual_cursor_x = self.spawn_x
         self.virtual_cursor_y = int(self.game.height / 2)
 
+    def snapshot(self):
+        return (
+            self.health, self.gold, self.lumber, self.income, self.level, self.stat_spawn_counter,
+            self.income_counter, self.virtual_cursor_x, self.virtual_cursor_y, tuple(self.spawn_queue),
+            self.units.snapshot(), self.buildings.snapshot()
+        )
+
+    def restore(self, snapshot):
+        (
+            self.health, self.gold, self.lumber, self.income, self.level, self.stat_spawn_counter,
+            self.income_counter, self.virtual_cursor_x, self.virtual_cursor_y, spawn_queue, units, buildings
+        ) = snapshot
+        self.spawn_queue[:] = spawn_queue
+        self.units.restore(units)
+        self.buildings.restore(buildings)
+
     def set_cursor(self, x, y):
         # Cannot perform action when game has ended.
         if self.game.winner:
@@ -175,12 +193,54 @@ class Player:
         if self.spawn_queue:
             self.spawn_queue.pop().spawn(self)
 
-        # Process units and buildings
-        for unit in self.units:
-            unit.update()
-            if unit.despawn:
-                unit.remove()
-                self.units.remove(unit)
+        # Process units
+        Ground.move(self)
+
+        # Process buildings
+        Building.shoot(self)
+        Building.decay(self)
+
+        # Despawn units and buildings that died or reached their goal
+        self.game.state.despawn_units(self.units)
+        self.game.state.despawn_units(self.buildings)
+
+    def idle_ticks(self):
+        # Number of upcoming ticks in which update() only counts down timers, before the next tick where income is
+        # paid, a queued unit spawns, a unit moves, a building may fire or a building runs out of health
+        if self.spawn_queue:
+            return 0
+        idle = self.income_counter - 1
+
+        n = len(self.units)
+        if n:
+            # Units wait while the tick-counter is positive and move on the tick after it runs out
+            idle = min(idle, int(np.ceil(self.units.tick_counter[:n].min())))
+
+        n = len(self.buildings)
+        if n:
+            # Buildings reload only while the opponent has units and are ready when the tick-counter runs out
+            if len(self.opponent.units):
+                idle = min(idle, int(np.ceil(self.buildings.tick_counter[:n].min())) - 1)
+
+            # Stop a tick early on decay, so the tick a building dies on is updated tick by tick
+            decaying = self.buildings.decay[:n] > 0
+            if decaying.any():
+                lifetime = self.buildings.health[:n][decaying] / self.buildings.decay[:n][decaying]
+                idle = min(idle, int(np.ceil(lifetime.min())) - 2)
+
+        return max(0, idle)
+
+    def skip(self, ticks):
+        # Counts down the timers for ticks idle ticks at once, as update() would do tick by tick
+        self.income_counter -= ticks
+
+        n = len(self.units)
+        self.units.tick_counter[:n] -= ticks
+
+        n = len(self.buildings)
+        if len(self.opponent.units):
+            self.buildings.tick_counter[:n] -= ticks
+        self.buildings.health[:n] -= ticks * self.buildings.decay[:n]
 
     def increase_gold(self, amount):
         self.gold += amount
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class RandomStream:
+    """
+    Per-game random numbers, drawn from a numpy Generator in blocks of uniform floats.
+
+    Damage rolls and spawn picks consume the block a few numbers at a time, so the Generator is only called once per
+    block. The stream position is the generator state the block was drawn from plus an index into it, which is all a
+    snapshot needs to hold.
+    """
+
+    def __init__(self, seed=None, block_size=4096):
+        self.block_size = block_size
+        self.generator = np.random.default_rng(seed)
+        self.block_state = None
+        self.block = None
+        self.index = 0
+        self._draw()
+
+    def _draw(self):
+        self.block_state = self.generator.bit_generator.state
+        self.block = self.generator.random(self.block_size)
+        self.index = 0
+
+    def seed(self, seed=None):
+        self.generator = np.random.default_rng(seed)
+        self._draw()
+
+    def uniform(self, n):
+        # n floats in [0, 1) from the block, drawing new blocks as needed
+        if self.index + n > self.block_size:
+            if n > self.block_size:
+                return np.concatenate([self.uniform(self.block_size) for _ in range(n // self.block_size)] + [
+                    self.uniform(n % self.block_size)
+                ])
+            self._draw()
+        values = self.block[self.index:self.index + n]
+        self.index += n
+        return values
+
+    def integers(self, low, high):
+        # Integers from low (inclusive) to high (exclusive), element-wise over arrays of bounds
+        low = np.asarray(low, dtype=np.int64)
+        high = np.asarray(high, dtype=np.int64)
+        return low + (self.uniform(low.size).reshape(low.shape) * (high - low)).astype(np.int64)
+
+    def randrange(self, n):
+        if self.index == self.block_size:
+            self._draw()
+        value = int(self.block[self.index] * n)
+        self.index += 1
+        return value
+
+    def snapshot(self):
+        return self.block_state, self.index
+
+    def restore(self, snapshot):
+        block_state, index = snapshot
+        if block_state is not self.block_state:
+            self.generator.bit_generator.state = block_state
+            self._draw()
+            self.block_state = block_state
+        self.index = index
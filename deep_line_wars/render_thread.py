@@ -0,0 +1,137 @@
+import copy
+import threading
+
+import numpy as np
+
+from .gui import get_engine
+
+
+class RenderThread:
+    """
+    Draws the frames of a game in a worker thread while the simulation keeps stepping.
+
+    Frames are drawn from snapshots (Game.snapshot()), which hold copies of the grid, the unit and building tables,
+    the cursors and the health of both players. The worker restores each snapshot into a private mirror game that
+    the GUI is attached to, so drawing never reads the live game. A snapshot handed over before the worker picked up
+    the previous one replaces it, so a slow GUI drops frames instead of holding back the simulation.
+
+    Frames are double buffered: get_state() reads the most recent completed frame while the next one is drawn into
+    the other buffer.
+
+    Window events are handled by render(), on the thread stepping the game, so closing the window still stops it.
+    Keyboard and mouse input of the GUI is disabled: it would act on the mirror, where the next snapshot overwrites
+    it. Actions are performed on the live game through its action spaces instead.
+    """
+
+    def __init__(self, game):
+        from .game import Game
+
+        # The mirror has the setup of the game but no GUI of its own, it is only ever restored and drawn
+        config = copy.copy(game.config)
+        config.gui = copy.copy(game.config.gui)
+        config.gui.engine = "dummy"
+        config.gui.render_thread = False
+        self.mirror = Game(game.width, game.height, config)
+        self.gui = get_engine(game.config.gui.engine)(self.mirror)
+        self.gui.input = False
+        self.grayscale = game.config.gui.state_representation == "L"
+
+        # Held while the GUI draws, handles events or updates the window
+        self.lock = threading.Lock()
+
+        self.condition = threading.Condition()
+        self.pending = None  # Snapshot waiting to be drawn
+        self.submitted = 0  # Number of the last snapshot handed over
+        self.completed = 0  # Number of the snapshot shown in the front buffer
+        self.frames = [None, None]
+        self.front = 0
+        self.error = None
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, name="RenderThread", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                snapshot, self.pending = self.pending, None
+                number = self.submitted
+
+            try:
+                with self.lock:
+                    self.mirror.restore(snapshot)
+                    self.gui.draw()
+                    state = self.gui.get_state(grayscale=self.grayscale, flip=self.mirror.state.flipped)
+
+                    back = 1 - self.front
+                    if self.frames[back] is None or self.frames[back].shape != state.shape:
+                        self.frames[back] = np.empty_like(state)
+                    np.copyto(self.frames[back], state)
+            except Exception as e:
+                with self.condition:
+                    self.error = e
+                    self.condition.notify_all()
+                return
+
+            with self.condition:
+                self.front = back
+                self.completed = number
+                self.condition.notify_all()
+
+    def _check(self):
+        if self.error is not None:
+            raise RuntimeError("Render thread failed") from self.error
+        if self.closed:
+            raise RuntimeError("Render thread is closed")
+
+    def render(self, game):
+        # Handles window events (not input, see above), then hands a snapshot of the game over to the worker
+        with self.lock:
+            self.mirror.running = game.running
+            self.gui.event()
+            game.running = self.mirror.running
+
+        snapshot = game.snapshot()
+        with self.condition:
+            self._check()
+            self.pending = snapshot
+            self.submitted += 1
+            self.condition.notify_all()
+
+    def render_window(self):
+        with self.lock:
+            self.gui.draw_screen()
+
+    def sync(self):
+        # Waits until every snapshot handed over so far is drawn, or dropped for a newer one
+        with self.condition:
+            while self.completed < self.submitted and self.error is None:
+                self.condition.wait()
+            self._check()
+
+    def get_state(self, out=None):
+        # Most recent completed frame, waiting only for the first one. With out, the frame is copied into it
+        with self.condition:
+            while self.completed == 0 and self.submitted and self.error is None:
+                self.condition.wait()
+            self._check()
+
+            frame = self.frames[self.front]
+            if frame is None:
+                raise RuntimeError("No frame was rendered yet")
+            if out is None:
+                return frame.copy()
+            np.copyto(out, frame)
+            return out
+
+    def close(self):
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
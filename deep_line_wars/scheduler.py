@@ -0,0 +1,106 @@
+import time
+
+
+class Scheduler:
+    """
+    Fixed timestep loop that runs a game in real time.
+
+    Ticks are paced at config.mechanics.ups with an accumulator, frames are rendered at fps and the frame and tick
+    rates are reported to the GUI caption at statps, all from one loop. The loop only sleeps until the next tick,
+    frame or stat report is due, so with ups <= 0 (or an ups the simulation cannot keep up with) it never sleeps.
+    When ticks fall behind, they are caught up only until the next frame is due, so frames keep their rate, and a
+    backlog of more than max_catch_up ticks is dropped instead of spiralling.
+
+    In headless mode there is no clock at all, ticks run back to back without rendering, stats or sleeping.
+
+    on_tick(game) is called before every tick, which is where agents perform their actions.
+    """
+
+    def __init__(self, game, on_tick=None, headless=False, max_catch_up=1000, clock=time.perf_counter,
+                 sleep=time.sleep):
+        self.game = game
+        self.on_tick = on_tick
+        self.headless = headless
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.sleep = sleep
+
+    def tick(self):
+        if self.on_tick:
+            self.on_tick(self.game)
+        self.game.update()
+
+    def running(self):
+        return self.game.running and not self.game.winner
+
+    def run(self, max_ticks=None):
+        # Runs until the game is won, stopped with game.set_running(False) or max_ticks have passed. Returns the
+        # number of ticks run
+        self.game.set_running(True)
+        if self.headless:
+            return self.run_headless(max_ticks)
+
+        game = self.game
+        tick_interval = game.update_interval()
+        frame_interval = game.render_interval()
+        stat_interval = game.stat_interval()
+
+        # With no frame rate a frame is rendered after every tick
+        catch_up = self.max_catch_up if frame_interval > 0 else 1
+
+        ticks = 0
+        frames = 0
+        stat_ticks = 0
+        stat_frames = 0
+        accumulator = 0.0
+        previous = next_frame = next_stat = self.clock()
+
+        while self.running() and (max_ticks is None or ticks < max_ticks):
+            now = self.clock()
+            accumulator += now - previous
+            previous = now
+
+            n = 0
+            while accumulator >= tick_interval and n < catch_up and self.running() and (
+                    max_ticks is None or ticks < max_ticks):
+                self.tick()
+                accumulator -= tick_interval
+                ticks += 1
+                n += 1
+                if frame_interval > 0 and self.clock() >= next_frame:
+                    # Catching up again after the frame
+                    break
+            # Fell behind by more than catch_up ticks, drop the rest of the backlog instead of spiralling
+            accumulator = min(accumulator, catch_up * tick_interval)
+
+            now = self.clock()
+            if now >= next_frame:
+                game.render()
+                game.render_window()
+                frames += 1
+                next_frame = max(next_frame + frame_interval, now)
+
+            if stat_interval and now >= next_stat:
+                game.frame_counter = int((frames - stat_frames) / stat_interval)
+                game.update_counter = int((ticks - stat_ticks) / stat_interval)
+                stat_frames, stat_ticks = frames, ticks
+                game.caption()
+                next_stat = max(next_stat + stat_interval, now)
+
+            # Sleep until the next tick, frame or stat report is due
+            wait = min(
+                tick_interval - accumulator - (self.clock() - previous),
+                next_frame - now if frame_interval > 0 else tick_interval,
+                next_stat - now if stat_interval else tick_interval
+            )
+            if wait > 0:
+                self.sleep(wait)
+
+        return ticks
+
+    def run_headless(self, max_ticks=None):
+        ticks = 0
+        while self.running() and (max_ticks is None or ticks < max_ticks):
+            self.tick()
+            ticks += 1
+        return ticks
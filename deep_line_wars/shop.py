@@ -50,10 +50,10 @@ class Shop:
         if entity_type == entity.Ground or entity_type == entity.Flying:
             # Unit
             unit = self.units[index]
-            return unit(player) if unit.can_afford(player) else Entity
+            return unit if unit.can_afford(player) else Entity
         elif entity_type == entity.Building:
             # Building
             building = self.buildings[index]
-            return building(player) if building.can_afford(player) else Entity
+            return building if building.can_afford(player) else Entity
         else:
             _LOGGER.error("Invalid entity_type %s", entity_type)
@@ -1,7 +1,123 @@
 import itertools
 import numpy as np
 
-from deep_line_wars.entity import Entity, Building
+
+
+class SpatialHash:
+    """
+    Uniform grid over the map where each cell lists the rows of the unit table positioned in it.
+
+    Cells are stored compactly, rows sorted by cell in order and the rows of cell c in order[start[c]:start[c + 1]].
+    The hash is rebuilt on the first query after the unit table has changed.
+    """
+
+    def __init__(self, units: 'UnitTable', width, height):
+        self.units: 'UnitTable' = units
+        self.width = width
+        self.height = height
+        self.version = None
+        self.order = np.zeros(0, dtype=np.int64)
+        self.start = np.zeros(width * height + 1, dtype=np.int64)
+
+    def rebuild(self):
+        n = len(self.units)
+        rows = np.flatnonzero(self.units.x[:n] >= 0)
+        cells = self.units.x[rows] * self.height + self.units.y[rows]
+
+        self.order = rows[np.argsort(cells, kind="stable")]
+        self.start[0] = 0
+        np.cumsum(np.bincount(cells, minlength=self.width * self.height), out=self.start[1:])
+        self.version = self.units.version
+
+    def query(self, x0, y0, x1, y1):
+        # Rows of the units in cells from (x0, y0) through (x1, y1) in cell order, which covers the box and the
+        # remaining cells of the columns between. Callers filter on exact distance.
+        if self.version != self.units.version:
+            self.rebuild()
+
+        first = max(0, x0) * self.height + max(0, y0)
+        last = min(self.width - 1, x1) * self.height + min(self.height - 1, y1)
+        if last < first:
+            return self.order[:0]
+        return self.order[self.start[first]:self.start[last + 1]]
+
+    def query_many(self, x0, y0, x1, y1):
+        # query() over several cell ranges given as arrays, in one gather. Ranges must be in cell order and must not
+        # overlap, the rows are then returned in cell order without duplicates.
+        if self.version != self.units.version:
+            self.rebuild()
+
+        first = np.maximum(0, x0) * self.height + np.maximum(0, y0)
+        last = np.minimum(self.width - 1, x1) * self.height + np.minimum(self.height - 1, y1)
+        keep = last >= first
+        lo = self.start[first[keep]]
+        lengths = self.start[last[keep] + 1] - lo
+
+        # Positions lo[i], lo[i] + 1, ..., lo[i] + lengths[i] - 1 of every range, back to back
+        offsets = np.cumsum(lengths) - lengths
+        return self.order[np.repeat(lo - offsets, lengths) + np.arange(lengths.sum())]
+
+
+class SpawnSlots:
+    """
+    Free tiles in the spawn area of a player, kept up to date as units enter and leave it.
+
+    Free tiles are kept densely in free[:n_free] with the position of every tile in position, so picking a random
+    free tile and occupying or freeing a tile are constant time.
+    """
+
+    def __init__(self, columns, height):
+        self.columns = list(columns)
+        self.height = height
+        self.size = len(self.columns) * height
+        self.count = np.zeros(self.size, dtype=np.int64)  # Units on each tile
+        self.free = np.arange(self.size)
+        self.position = np.arange(self.size)
+        self.n_free = self.size
+
+    def reset(self):
+        self.count[:] = 0
+        self.free[:] = np.arange(self.size)
+        self.position[:] = np.arange(self.size)
+        self.n_free = self.size
+
+    def snapshot(self):
+        return self.count.copy(), self.free.copy(), self.position.copy(), self.n_free
+
+    def restore(self, snapshot):
+        count, free, position, self.n_free = snapshot
+        self.count[:] = count
+        self.free[:] = free
+        self.position[:] = position
+
+    def is_full(self):
+        return self.n_free == 0
+
+    def update(self, x, y, delta):
+        tile = (x - self.columns[0]) * self.height + y
+        self.count[tile] += delta
+
+        if delta > 0 and self.count[tile] == delta:
+            # Occupied, swap the tile with the last free tile
+            i = self.position[tile]
+            last = self.free[self.n_free - 1]
+            self.free[i], self.position[last] = last, i
+            self.free[self.n_free - 1], self.position[tile] = tile, self.n_free - 1
+            self.n_free -= 1
+        elif delta < 0 and self.count[tile] == 0:
+            # Freed, swap the tile with the first occupied tile
+            i = self.position[tile]
+            first = self.free[self.n_free]
+            self.free[i], self.position[first] = first, i
+            self.free[self.n_free], self.position[tile] = tile, self.n_free
+            self.n_free += 1
+
+    def choice(self, random: 'RandomStream'):
+        tile = self.free[random.randrange(self.n_free)]
+        return self.columns[tile // self.height], tile % self.height
+
+    def free_tiles(self):
+        return [(self.columns[tile // self.height], tile % self.height) for tile in self.free[:self.n_free]]
 
 
 class State:
@@ -30,6 +146,15 @@ class State:
 
         self.static_tiles = []
 
+        # Spatial hash of unit positions per player id
+        self.unit_cells = {}
+
+        # Free spawn tiles per player, indexed by player id - 1. spawn_owner maps x to that index or -1
+        self.spawn_slots = [SpawnSlots(columns, height) for columns in self.spawn_area]
+        self.spawn_owner = np.full(width, -1, dtype=np.int64)
+        for i, columns in enumerate(self.spawn_area):
+            self.spawn_owner[columns] = i
+
         self.setup_environment()
         self.flipped = False  # Whether the state is flipped or not
 
@@ -43,27 +168,64 @@ class State:
             self.grid[0, x] = State.CENTER_AREA
             self.static_tiles.extend([(x, y, State.CENTER_AREA) for y in range(0, self.height)])
 
-    def update(self, entity, x, y):
-        a, b = (3, 4) if entity.entity_type == Building else (0, 1)
-
-        if entity.x is not None and entity.y is not None:
-            self.grid[a, entity.x, entity.y] = 0
-            self.grid[b, entity.x, entity.y] = 0
-            entity.x = -1
-            entity.y = -1
+    def update_units(self, units, rows, x=None, y=None):
+        # Moves rows of a unit or building table to (x, y), or removes them from the grid when no position is given
+        a, b = units.LAYERS
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return
+        units.version += 1
+
+        placed = rows[units.x[rows] >= 0]
+        self.grid[a, units.x[placed], units.y[placed]] = 0
+        self.grid[b, units.x[placed], units.y[placed]] = 0
+        if a == 1:
+            self._update_spawn_slots(units.x[placed], units.y[placed], -1)
+        units.x[rows] = -1
+        units.y[rows] = -1
 
         if x is not None and y is not None:
-            self.grid[a, x, y] = entity.id
-            self.grid[b, x, y] = entity.player.id
-            entity.x = x
-            entity.y = y
+            units.x[rows] = x
+            units.y[rows] = y
+            self.grid[a, units.x[rows], units.y[rows]] = units.type_id[rows]
+            self.grid[b, units.x[rows], units.y[rows]] = units.player.id
+            if a == 1:
+                self._update_spawn_slots(units.x[rows], units.y[rows], 1)
+
+    def _update_spawn_slots(self, x, y, delta):
+        # Units entering or leaving spawn areas
+        if x.size == 0:
+            return
+        owner = self.spawn_owner[x]
+        for i in np.flatnonzero(owner >= 0):
+            self.spawn_slots[owner[i]].update(x[i], y[i], delta)
+
+    def despawn_units(self, units):
+        # Remove units or buildings that died or reached their goal
+        despawned = np.flatnonzero(units.despawn[:len(units)])
+        if despawned.size:
+            self.update_units(units, despawned)
+            units.remove_despawned(despawned)
+
+    def get_unit_cells(self, units) -> SpatialHash:
+        cells = self.unit_cells.get(units.player.id)
+        if cells is None or cells.units is not units:
+            cells = self.unit_cells[units.player.id] = SpatialHash(units, self.width, self.height)
+        return cells
 
     def free_spawn_points(self, player):
-        items = []
-        for x in self.spawn_area[player.id - 1]:
-            items.extend([(x, y[0]) for y in np.argwhere(self.grid[1, x] == 0)])
+        return self.spawn_slots[player.id - 1].free_tiles()
+
+    def snapshot(self):
+        return self.grid.copy(), self.flipped, tuple(spawn_slots.snapshot() for spawn_slots in self.spawn_slots)
 
-        return items
+    def restore(self, snapshot):
+        grid, self.flipped, spawn_slots = snapshot
+        self.grid[:] = grid
+        for slots, slots_snapshot in zip(self.spawn_slots, spawn_slots):
+            slots.restore(slots_snapshot)
 
     def reset(self):
         self.grid[1:] = 0
+        for spawn_slots in self.spawn_slots:
+            spawn_slots.reset()
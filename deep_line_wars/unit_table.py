@@ -0,0 +1,170 @@
+import typing
+from collections import namedtuple
+
+import numpy as np
+
+
+class UnitTable:
+    """
+    Struct-of-arrays storage for the units of a player.
+
+    Each live unit is a row, the first len(table) rows of every column are in use. Columns are preallocated and
+    doubled when full, so unit logic runs as column operations instead of walking Python objects.
+    """
+
+    COLUMNS = (
+        ("type_id", np.int8),
+        ("x", np.int64),
+        ("y", np.int64),
+        ("health", np.float64),
+        ("armor", np.float64),
+        ("tick_counter", np.float64),
+        ("tick_speed", np.float64),
+        ("despawn", np.bool_)
+    )
+
+    View = namedtuple("View", [name for name, _ in COLUMNS])
+
+    # Grid layers for the entity id and the player id
+    LAYERS = (1, 2)
+
+    def __init__(self, player: 'Player', capacity: int = 64):
+        self.player: 'Player' = player
+        self.types: typing.Dict[int, typing.Type['Entity']] = {}
+        self.size = 0
+        self.capacity = capacity
+        self.version = 0  # Incremented whenever rows or positions change
+
+        # Gold cost by type id, used to settle kill gold
+        self.type_cost_gold = np.zeros(np.iinfo(np.int8).max + 1, dtype=np.float64)
+
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.size = 0
+        self.version += 1
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, dtype in self.COLUMNS:
+            column = np.zeros(self.capacity, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+    def _register(self, cls: typing.Type['Entity']):
+        self.types[cls.id] = cls
+        self.type_cost_gold[cls.id] = cls.cost_gold
+
+    def add(self, cls: typing.Type['Entity']):
+        if self.size == self.capacity:
+            self._grow()
+
+        row = self.size
+        self.size += 1
+        self.version += 1
+
+        self._register(cls)
+        self.type_id[row] = cls.id
+        self.x[row] = -1
+        self.y[row] = -1
+        self.health[row] = cls.health
+        self.armor[row] = cls.armor
+        self.tick_speed[row] = 0 if cls.speed == 0 else self.player.game.ticks_per_second / cls.speed
+        self.tick_counter[row] = self.tick_speed[row]
+        self.despawn[row] = False
+
+        return row
+
+    def damage(self, rows, amount):
+        rows = np.atleast_1d(rows)
+        was_alive = self.health[rows] > 0
+        np.subtract.at(self.health, rows, amount)
+
+        killed = np.unique(rows[was_alive & (self.health[rows] <= 0)])
+        self.despawn[killed] = True
+
+        # Increase opponents gold with a ratio of what the units were worth.
+        if killed.size:
+            self.player.opponent.increase_gold(
+                float(self.type_cost_gold[self.type_id[killed]].sum()) * self.player.game.config.mechanics.kill_gold_ratio
+            )
+
+        return killed
+
+    def remove_despawned(self, rows=None):
+        # Compact the surviving rows in one sweep, keeping their order. Rows before the first despawned row are
+        # already in place, so only the tail is moved.
+        n = self.size
+        rows = np.flatnonzero(self.despawn[:n]) if rows is None else np.asarray(rows)
+        if rows.size == 0:
+            return
+
+        first = int(rows.min())
+        survivors = first + np.flatnonzero(~self.despawn[first:n])
+        m = first + survivors.size
+
+        for name, _ in self.COLUMNS:
+            column = getattr(self, name)
+            column[first:m] = column[survivors]
+        self.size = m
+        self.version += 1
+
+    def snapshot(self):
+        # Copies of the live rows of every column, along with the entity types they refer to
+        return tuple(self.types.values()), tuple(getattr(self, name)[:self.size].copy() for name, _ in self.COLUMNS)
+
+    def restore(self, snapshot):
+        # Copies a snapshot back into the existing columns, growing them only when the snapshot does not fit
+        types, columns = snapshot
+        for cls in types:
+            if cls.id not in self.types:
+                self._register(cls)
+
+        n = len(columns[0])
+        while self.capacity < n:
+            self._grow()
+
+        for (name, _), column in zip(self.COLUMNS, columns):
+            getattr(self, name)[:n] = column
+        self.size = n
+        self.version += 1
+
+    def view(self):
+        # Read-only view of the live rows, used by the renderers
+        columns = []
+        for name, _ in self.COLUMNS:
+            column = getattr(self, name)[:self.size].view()
+            column.flags.writeable = False
+            columns.append(column)
+        return self.View(*columns)
+
+
+class BuildingTable(UnitTable):
+    """Unit table for the buildings of a player, with the attack and decay of each building."""
+
+    COLUMNS = UnitTable.COLUMNS + (
+        ("enemy_territory", np.bool_),
+        ("decay", np.float64),
+        ("attack_min", np.int64),
+        ("attack_max", np.int64),
+        ("attack_pen", np.float64),
+        ("attack_range", np.float64)
+    )
+
+    View = namedtuple("View", [name for name, _ in COLUMNS])
+
+    LAYERS = (3, 4)
+
+    def add(self, cls: typing.Type['Entity']):
+        row = super().add(cls)
+        self.enemy_territory[row] = False
+        self.decay[row] = 0
+        self.attack_min[row] = cls.attack.min
+        self.attack_max[row] = cls.attack.max
+        self.attack_pen[row] = cls.attack.pen
+        self.attack_range[row] = cls.attack.range
+        return row
@@ -0,0 +1,543 @@
+import numpy as np
+
+from .action_space import StandardActionSpace
+from .config import Config
+from .shop import Shop
+from .state import State
+
+
+class VecGame:
+    """
+    Steps N independent matches in lock-step.
+
+    All simulation state lives in stacked NumPy arrays with the match index as the leading axis, so the cost of
+    a step is a fixed number of array operations regardless of how many matches are simulated. The rules follow
+    Game.step: the selected player acts, then both players are updated (player 1 first) and the reward is
+    computed from the selected players perspective.
+
+    Observations are the RAW grid layers in the layout of config.gui.raw_layout, (N, 5, H, W) for channels first,
+    mirrored along x for matches where player 2 is selected. The layers are written in the same order as Game writes
+    them. Spawn tiles and damage rolls are drawn from a different random stream than Game's, so the same actions only
+    give the same match while neither comes into play.
+    """
+
+    # Action kinds
+    NOOP = 0
+    CURSOR = 1
+    SEND = 2
+    BUILD = 3
+
+    _ACTIONS = {
+        "cursor_left": (CURSOR, (-1, 0)),
+        "cursor_right": (CURSOR, (1, 0)),
+        "cursor_up": (CURSOR, (0, -1)),
+        "cursor_down": (CURSOR, (0, 1)),
+        "send_militia": (SEND, Shop.MILITIA),
+        "send_footman": (SEND, Shop.FOOTMAN),
+        "send_grunt": (SEND, Shop.GRUNT),
+        "send_armored_grunt": (SEND, Shop.ARMORED_GRUNT),
+        "build_basic_tower": (BUILD, Shop.BASIC_TOWER),
+        "build_fast_tower": (BUILD, Shop.FAST_TOWER),
+        "build_faster_tower": (BUILD, Shop.FASTER_TOWER),
+        "no_action": (NOOP, None)
+    }
+
+    def __init__(self, num_envs, width, height, config: Config = None, seed=None, unit_capacity=32):
+        self.config = config if config else Config()
+        self.config.set_size(width, height)
+        self.config.validate()
+
+        self.num_envs = num_envs
+        self.width = self.config.width
+        self.height = self.config.height
+        self.ticks_per_second = self.config.mechanics.ticks_per_second
+
+        self.random = np.random.default_rng(seed)
+        self.shop = Shop(self)
+
+        self._setup_tables()
+        self._setup_map()
+
+        n = num_envs
+
+        # Z = 0 - Environmental Layer, Z = 1 - Unit Layer, Z = 2 - Unit Player Layer,
+        # Z = 3 - Building Layer, Z = 4 - Building Player Layer
+        self.grid = np.zeros((n, 5, width, height), dtype=np.uint8)
+        self.grid[:, 0] = self._environment
+
+        # Match variables
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.winner = np.full(n, -1, dtype=np.int8)  # Index of the winning player, -1 while running
+        self.selected = np.zeros(n, dtype=np.int8)  # Index of the player that performs actions
+
+        # Player variables, indexed [match, player]
+        self.health = np.zeros((n, 2), dtype=np.float64)
+        self.gold = np.zeros((n, 2), dtype=np.float64)
+        self.income = np.zeros((n, 2), dtype=np.float64)
+        self.income_counter = np.zeros((n, 2), dtype=np.int64)
+        self.cursor_x = np.zeros((n, 2), dtype=np.int64)
+        self.cursor_y = np.zeros((n, 2), dtype=np.int64)
+
+        # Spawn queue, a stack of unit type ids per player
+        self.queue = np.zeros((n, 2, 8), dtype=np.int8)
+        self.queue_len = np.zeros((n, 2), dtype=np.int64)
+
+        # Unit table, indexed [match, player, slot]. Slots with type 0 are free.
+        self.unit_type = np.zeros((n, 2, unit_capacity), dtype=np.int8)
+        self.unit_x = np.zeros((n, 2, unit_capacity), dtype=np.int64)
+        self.unit_y = np.zeros((n, 2, unit_capacity), dtype=np.int64)
+        self.unit_health = np.zeros((n, 2, unit_capacity), dtype=np.float64)
+        self.unit_tick_counter = np.zeros((n, 2, unit_capacity), dtype=np.float64)
+        self.unit_seq = np.zeros((n, 2, unit_capacity), dtype=np.int64)  # Spawn order, for targeting and drawing
+        self._next_seq = 1
+
+        # Buildings are stored per tile since a tile holds at most one building. Type and owner are layer 3 and 4.
+        self.building_health = np.zeros((n, width, height), dtype=np.float64)
+        self.building_enemy_territory = np.zeros((n, width, height), dtype=np.bool_)
+
+        self.reset()
+
+    def _setup_tables(self):
+        # Lookup tables for entity stats, indexed by entity id
+        mechanics = self.config.mechanics
+        self.action_names = StandardActionSpace.action_names()
+        self.action_kind = np.zeros(len(self.action_names), dtype=np.int8)
+        self.action_dx = np.zeros(len(self.action_names), dtype=np.int64)
+        self.action_dy = np.zeros(len(self.action_names), dtype=np.int64)
+        self.action_entity = np.zeros(len(self.action_names), dtype=np.int8)
+
+        for a, name in enumerate(self.action_names):
+            kind, arg = VecGame._ACTIONS[name]
+            self.action_kind[a] = kind
+            if kind == VecGame.CURSOR:
+                self.action_dx[a], self.action_dy[a] = arg
+            elif kind == VecGame.SEND:
+                self.action_entity[a] = self.shop.units[arg].id
+            elif kind == VecGame.BUILD:
+                self.action_entity[a] = self.shop.buildings[arg].id
+
+        units = list(self.shop.units.values())
+        size = max(u.id for u in units) + 1
+        self.unit_cost = np.zeros(size, dtype=np.float64)
+        self.unit_max_health = np.zeros(size, dtype=np.float64)
+        self.unit_armor = np.zeros(size, dtype=np.float64)
+        self.unit_tick_speed = np.zeros(size, dtype=np.float64)
+        for u in units:
+            self.unit_cost[u.id] = u.cost_gold
+            self.unit_max_health[u.id] = u.health
+            self.unit_armor[u.id] = u.armor
+            self.unit_tick_speed[u.id] = 0 if u.speed == 0 else mechanics.ticks_per_second / u.speed
+
+        buildings = list(self.shop.buildings.values())
+        size = max(b.id for b in buildings) + 1
+        self.building_cost = np.zeros(size, dtype=np.float64)
+        self.building_max_health = np.zeros(size, dtype=np.float64)
+        self.building_attack_min = np.zeros(size, dtype=np.int64)
+        self.building_attack_max = np.zeros(size, dtype=np.int64)
+        self.building_attack_pen = np.zeros(size, dtype=np.float64)
+        self.building_attack_range = np.zeros(size, dtype=np.float64)
+        for b in buildings:
+            self.building_cost[b.id] = b.cost_gold
+            self.building_max_health[b.id] = b.health
+            self.building_attack_min[b.id] = b.attack.min
+            self.building_attack_max[b.id] = b.attack.max
+            self.building_attack_pen[b.id] = b.attack.pen
+            self.building_attack_range[b.id] = b.attack.range
+
+    def _setup_map(self):
+        spawn_area_size = self.config.map.spawn_area_size
+        self.spawn_area = [
+            np.arange(0, spawn_area_size),
+            np.arange(self.width - spawn_area_size, self.width)
+        ]
+
+        center = self.width / 2
+        self.center_area = [int(center), int(center - 1)] if center.is_integer() else [int(center)]
+
+        self._environment = np.zeros((self.width, self.height), dtype=np.uint8)
+        self._environment[np.concatenate(self.spawn_area)] = State.SPAWN_AREA
+        self._environment[self.center_area] = State.CENTER_AREA
+
+        self.direction = np.array([1, -1])
+        self.spawn_x = np.array([0, self.width - 1])
+        self.goal_x = np.array([self.width - 1, 0])
+
+    def get_action_space(self):
+        return len(self.action_names)
+
+    def action_mask(self):
+        # (N, actions) boolean mask of the actions that are not a no-op for the selected player of each match, with
+        # the same rules as _perform
+        envs = np.arange(self.num_envs)
+        p = self.selected
+        x, y, gold = self.cursor_x[envs, p], self.cursor_y[envs, p], self.gold[envs, p]
+        running = self.winner < 0
+        kind = self.action_kind
+        entity = self.action_entity
+
+        mask = np.ones((self.num_envs, len(self.action_names)), dtype=np.bool_)
+
+        cursor = kind == VecGame.CURSOR
+        moved_x = x[:, None] + self.action_dx[cursor]
+        moved_y = y[:, None] + self.action_dy[cursor]
+        mask[:, cursor] = (moved_x >= 0) & (moved_x < self.width) & (moved_y >= 0) & (moved_y < self.height) & \
+            running[:, None]
+
+        send = kind == VecGame.SEND
+        mask[:, send] = (gold[:, None] > self.unit_cost[entity[send]]) & running[:, None]
+
+        free = (self.grid[envs, 4, x, y] == 0) & (x != 0) & (x != self.width - 1)
+        if not self.config.mechanics.build_anywhere:
+            free &= ~np.where(p == 0, x >= min(self.center_area), x <= max(self.center_area))
+        build = kind == VecGame.BUILD
+        mask[:, build] = (gold[:, None] > self.building_cost[entity[build]]) & (free & running)[:, None]
+
+        return mask
+
+    def game_time(self):
+        return self.ticks / self.ticks_per_second
+
+    def is_terminal(self):
+        return self.winner >= 0
+
+    def flip_player(self):
+        self.selected ^= 1
+
+    def reset(self, envs=None):
+        """Reset all matches, or only the matches in envs (index array or boolean mask)."""
+        envs = np.arange(self.num_envs) if envs is None else np.asarray(envs)
+        if envs.dtype == np.bool_:
+            envs = np.flatnonzero(envs)
+
+        mechanics = self.config.mechanics
+
+        self.grid[envs, 1:] = 0
+        self.ticks[envs] = 0
+        self.winner[envs] = -1
+
+        self.health[envs] = mechanics.start_health
+        self.gold[envs] = mechanics.start_gold
+        self.income[envs] = mechanics.start_income
+        self.income_counter[envs] = mechanics.income_frequency * mechanics.ticks_per_second
+        self.cursor_x[envs] = self.spawn_x
+        self.cursor_y[envs] = int(self.height / 2)
+        self.queue_len[envs] = 0
+
+        self.unit_type[envs] = 0
+        self.building_health[envs] = 0
+        self.building_enemy_territory[envs] = False
+
+        return self.get_state()
+
+    def get_state(self, out=None):
+        # Observations from the perspective of the selected player, written into out when given
+        layout = self.config.gui.raw_layout
+        if layout == "channels_first":
+            state = self.grid.transpose(0, 1, 3, 2)
+        elif layout == "channels_last":
+            state = self.grid.transpose(0, 3, 2, 1)
+        else:
+            raise NotImplementedError("raw_layout must be channels_first or channels_last")
+
+        if out is None:
+            out = np.empty(state.shape, dtype=state.dtype)
+        np.copyto(out, state)
+
+        flipped = np.flatnonzero(self.selected == 1)
+        if flipped.size:
+            out[flipped] = state[flipped, :, :, ::-1] if layout == "channels_first" else state[flipped, :, ::-1]
+        return out
+
+    def step(self, actions, frame_skip: int = None):
+        frame_skip = frame_skip if frame_skip is not None else self.config.mechanics.frame_skip
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_envs, ):
+            raise ValueError("Expected actions of shape (%s,), got %s" % (self.num_envs, actions.shape))
+        if np.any((actions < 0) | (actions >= len(self.action_names))):
+            raise ValueError("Out of bounds action when size of the action-space is %s" % len(self.action_names))
+
+        # Perform actions
+        self._perform(actions)
+
+        envs = np.arange(self.num_envs)
+        reward = np.zeros(self.num_envs)
+        done = np.zeros(self.num_envs, dtype=np.bool_)
+        for _ in range(frame_skip):
+
+            # Update state
+            self.update()
+
+            # Evaluate terminal state and reward for the selected player, summed until the match ends
+            terminal = self.is_terminal()
+            losing = self.health[envs, self.selected] < self.health[envs, self.selected ^ 1]
+            tick_reward = np.where(losing, -1.0, 0.001)
+            tick_reward[terminal] = np.where(self.winner[terminal] == self.selected[terminal], 1.0, -1.0)
+            reward[~done] += tick_reward[~done]
+            done |= terminal
+            if done.all():
+                break
+
+        return self.get_state(), reward, done, {}
+
+    def update(self):
+        active = self.winner < 0
+        self.ticks[active] += 1
+
+        for p in (0, 1):
+            envs = np.flatnonzero(active)
+            if envs.size == 0:
+                break
+
+            self._update_player(envs, p)
+
+            lost = envs[self.health[envs, p] <= 0]
+            self.winner[lost] = p ^ 1
+            active[lost] = False
+
+    def _perform(self, actions):
+        running = self.winner < 0
+        kind = self.action_kind[actions]
+
+        # Cursor movement
+        envs = np.flatnonzero(running & (kind == VecGame.CURSOR))
+        if envs.size:
+            p = self.selected[envs]
+            a = actions[envs]
+            self.cursor_x[envs, p] = np.clip(self.cursor_x[envs, p] + self.action_dx[a], 0, self.width - 1)
+            self.cursor_y[envs, p] = np.clip(self.cursor_y[envs, p] + self.action_dy[a], 0, self.height - 1)
+
+        # Send units
+        envs = np.flatnonzero(running & (kind == VecGame.SEND))
+        if envs.size:
+            p = self.selected[envs]
+            unit = self.action_entity[actions[envs]]
+            cost = self.unit_cost[unit]
+            can_afford = self.gold[envs, p] > cost
+            envs, p, unit, cost = envs[can_afford], p[can_afford], unit[can_afford], cost[can_afford]
+            self.gold[envs, p] -= cost
+            self.income[envs, p] += cost * self.config.mechanics.income_ratio
+            self._spawn_units(envs, p, unit)
+
+        # Build towers
+        envs = np.flatnonzero(running & (kind == VecGame.BUILD))
+        if envs.size:
+            p = self.selected[envs]
+            building = self.action_entity[actions[envs]]
+            self._spawn_buildings(envs, p, building, self.cursor_x[envs, p], self.cursor_y[envs, p])
+
+    def _spawn_units(self, envs, p, unit):
+        if envs.size == 0:
+            return
+
+        # Pick a random free tile in the spawn area, units that does not fit are queued. Like the spawn slots of State,
+        # a tile is free when no unit of either player is on it, whatever the unit layers show
+        cols = np.stack(self.spawn_area)[p]
+        occupied = np.zeros((envs.size, self.width, self.height), dtype=np.bool_)
+        e, q, slot = np.nonzero(self.unit_type[envs] > 0)
+        occupied[e, self.unit_x[envs[e], q, slot], self.unit_y[envs[e], q, slot]] = True
+        free = ~occupied[np.arange(envs.size)[:, None], cols]
+        free = free.reshape(envs.size, -1)
+
+        keys = self.random.random(free.shape)
+        keys[~free] = -1
+        tile = np.argmax(keys, axis=1)
+        placed = free.any(axis=1)
+
+        self._push_queue(envs[~placed], p[~placed], unit[~placed])
+
+        envs, p, unit, tile = envs[placed], p[placed], unit[placed], tile[placed]
+        if envs.size == 0:
+            return
+
+        x = cols[np.arange(envs.size), tile // self.height]
+        y = tile % self.height
+
+        slot = self._free_unit_slots(envs, p)
+        self.unit_type[envs, p, slot] = unit
+        self.unit_x[envs, p, slot] = x
+        self.unit_y[envs, p, slot] = y
+        self.unit_health[envs, p, slot] = self.unit_max_health[unit]
+        self.unit_tick_counter[envs, p, slot] = self.unit_tick_speed[unit]
+        self.unit_seq[envs, p, slot] = self._next_seq + np.arange(envs.size)
+        self._next_seq += envs.size
+
+        self.grid[envs, 1, x, y] = unit
+        self.grid[envs, 2, x, y] = p + 1
+
+    def _free_unit_slots(self, envs, p):
+        free = self.unit_type[envs, p] == 0
+        if not free.any(axis=1).all():
+            self._grow_units()
+            free = self.unit_type[envs, p] == 0
+        return np.argmax(free, axis=1)
+
+    def _grow_units(self):
+        for name in ("unit_type", "unit_x", "unit_y", "unit_health", "unit_tick_counter", "unit_seq"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate((column, np.zeros_like(column)), axis=2))
+
+    def _push_queue(self, envs, p, unit):
+        if envs.size == 0:
+            return
+        if np.any(self.queue_len[envs, p] >= self.queue.shape[2]):
+            self.queue = np.concatenate((self.queue, np.zeros_like(self.queue)), axis=2)
+        self.queue[envs, p, self.queue_len[envs, p]] = unit
+        self.queue_len[envs, p] += 1
+
+    def _spawn_buildings(self, envs, p, building, x, y):
+        mechanics = self.config.mechanics
+        cost = self.building_cost[building]
+
+        # Ensure that the player can afford it and that there is no building on this tile
+        ok = (self.gold[envs, p] > cost) & (self.grid[envs, 4, x, y] == 0) & (x != 0) & (x != self.width - 1)
+
+        over_center = np.where(p == 0, x >= min(self.center_area), x <= max(self.center_area))
+        if not mechanics.build_anywhere:
+            ok &= ~over_center
+
+        envs, p, building, x, y, cost = envs[ok], p[ok], building[ok], x[ok], y[ok], cost[ok]
+        self.gold[envs, p] -= cost
+        self.income[envs, p] += cost * mechanics.income_ratio
+
+        self.grid[envs, 3, x, y] = building
+        self.grid[envs, 4, x, y] = p + 1
+        self.building_health[envs, x, y] = self.building_max_health[building]
+        self.building_enemy_territory[envs, x, y] = over_center[ok]
+
+    def _update_player(self, envs, p):
+        mechanics = self.config.mechanics
+        q = p ^ 1
+
+        # Income logic
+        self.income_counter[envs, p] -= 1
+        paid = envs[self.income_counter[envs, p] == 0]
+        self.gold[paid, p] += self.income[paid, p]
+        self.income_counter[paid, p] = mechanics.income_frequency * mechanics.ticks_per_second
+
+        # Spawn one unit from the queue
+        queued = envs[self.queue_len[envs, p] > 0]
+        if queued.size:
+            self.queue_len[queued, p] -= 1
+            unit = self.queue[queued, p, self.queue_len[queued, p]]
+            can_afford = self.gold[queued, p] >= self.unit_cost[unit]
+            queued, unit = queued[can_afford], unit[can_afford]
+            self.gold[queued, p] -= self.unit_cost[unit]
+            self.income[queued, p] += self.unit_cost[unit] * mechanics.income_ratio
+            self._spawn_units(queued, np.full(queued.size, p), unit)
+
+        units = self.unit_type[envs, p]
+        alive = units > 0
+
+        # Units killed by the opponent are removed before they can move
+        dead = alive & (self.unit_health[envs, p] <= 0)
+        alive &= ~dead
+
+        # Move units when their tick-counter has expired
+        tick_counter = self.unit_tick_counter[envs, p]
+        waiting = alive & (tick_counter > 0)
+        moving = alive & ~waiting
+        tick_counter[waiting] -= 1
+        tick_counter[moving] = self.unit_tick_speed[units[moving]]
+        self.unit_tick_counter[envs, p] = tick_counter
+
+        # The unit layers are updated like State.update_units does: the tiles of moving units are cleared, then the
+        # units are drawn on their new tiles in spawn order, so the unit drawn last shows on a shared tile
+        e, slot = np.nonzero(moving)
+        e = envs[e]
+        x, y = self.unit_x[e, p, slot], self.unit_y[e, p, slot]
+        self.grid[e, 1, x, y] = 0
+        self.grid[e, 2, x, y] = 0
+        x += self.direction[p]
+        self.unit_x[e, p, slot] = x
+        order = np.argsort(self.unit_seq[e, p, slot], kind="stable")
+        self.grid[e[order], 1, x[order], y[order]] = self.unit_type[e, p, slot][order]
+        self.grid[e[order], 2, x[order], y[order]] = p + 1
+
+        # Units reaching the goal damages the opponent
+        reached = moving & (self.unit_x[envs, p] == self.goal_x[p])
+        self.health[envs, q] -= reached.sum(axis=1)
+
+        # Removed units clear their tile, as State.despawn_units does
+        e, slot = np.nonzero(dead | reached)
+        e = envs[e]
+        x, y = self.unit_x[e, p, slot], self.unit_y[e, p, slot]
+        self.grid[e, 1, x, y] = 0
+        self.grid[e, 2, x, y] = 0
+
+        units[dead | reached] = 0
+        self.unit_type[envs, p] = units
+
+        self._shoot(envs, p)
+        self._decay(envs, p)
+
+    def _shoot(self, envs, p):
+        q = p ^ 1
+
+        # Only matches where the opponent has units can have shooting towers
+        envs = envs[(self.unit_type[envs, q] > 0).any(axis=1)]
+
+        # Every tower fires at an opponent unit within range picked by config.mechanics.target_policy
+        e, x, y = np.nonzero(self.grid[envs, 4] == p + 1)
+        if e.size == 0:
+            return
+        e = envs[e]
+        building = self.grid[e, 3, x, y]
+
+        units = self.unit_type[e, q]
+        # Squared distances on integer tiles, equivalent to comparing math.hypot with the range
+        distance = (x[:, None] - self.unit_x[e, q]) ** 2 + (y[:, None] - self.unit_y[e, q]) ** 2
+        in_range = (units > 0) & (distance <= self.building_attack_range[building][:, None] ** 2)
+
+        # Ties go to the unit that spawned first, as in Building.shoot
+        policy = self.config.mechanics.target_policy
+        candidates = in_range
+        if policy == "closest":
+            key = np.where(in_range, distance, np.iinfo(np.int64).max)
+            candidates = in_range & (key == key.min(axis=1, keepdims=True))
+        elif policy == "lowest_health":
+            key = np.where(in_range, self.unit_health[e, q], np.inf)
+            candidates = in_range & (key == key.min(axis=1, keepdims=True))
+        order = np.where(candidates, self.unit_seq[e, q], np.iinfo(np.int64).max)
+        target = np.argmin(order, axis=1)
+        shooting = in_range.any(axis=1)
+
+        e, building, target = e[shooting], building[shooting], target[shooting]
+        if e.size == 0:
+            return
+
+        # Attack-dmg - min(0, (armor - attack_pen))
+        armor = self.unit_armor[self.unit_type[e, q, target]]
+        damage = self.random.integers(self.building_attack_min[building], self.building_attack_max[building] + 1)
+        damage = damage - np.minimum(0, armor - self.building_attack_pen[building])
+
+        was_alive = self.unit_health[e, q, target] > 0
+        np.add.at(self.unit_health, (e, q, target), -damage)
+
+        # Increase gold with a ratio of what the killed units were worth, once per unit
+        killed = was_alive & (self.unit_health[e, q, target] <= 0)
+        capacity = self.unit_type.shape[2]
+        killed = np.unique(e[killed] * capacity + target[killed])
+        e, target = killed // capacity, killed % capacity
+        reward = self.unit_cost[self.unit_type[e, q, target]] * self.config.mechanics.kill_gold_ratio
+        np.add.at(self.gold, (e, p), reward)
+
+    def _decay(self, envs, p):
+        mechanics = self.config.mechanics
+
+        # Decay health for buildings, faster on enemy territory
+        e, x, y = np.nonzero(self.grid[envs, 4] == p + 1)
+        if e.size == 0:
+            return
+        e = envs[e]
+        building = self.grid[e, 3, x, y]
+        ratio = np.where(
+            self.building_enemy_territory[e, x, y],
+            mechanics.enemy_territory_decay,
+            mechanics.friendly_territory_decay
+        )
+        self.building_health[e, x, y] -= self.building_max_health[building] * ratio
+
+        destroyed = self.building_health[e, x, y] <= 0
+        e, x, y = e[destroyed], x[destroyed], y[destroyed]
+        self.grid[e, 3, x, y] = 0
+        self.grid[e, 4, x, y] = 0
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+import time
+
+# Start-up cost of a headless rollout worker: a fresh interpreter that imports the game and builds a match with
+# the dummy GUI and RAW state. Neither pygame nor OpenCV should be loaded.
+WORKER = """
+import sys, time
+s = time.time()
+from deep_line_wars.config import Config
+from deep_line_wars.game import Game
+imported = time.time()
+g = Game(11, 11, Config(gui=Config.GUI(engine="dummy", state_representation="RAW")))
+g.reset()
+g.step(0)
+print(imported - s, time.time() - imported, "pygame" in sys.modules, "cv2" in sys.modules)
+"""
+
+if __name__ == "__main__":
+    runs = 10
+    results = []
+
+    s = time.time()
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", WORKER], universal_newlines=True)
+        results.append(output.split())
+    elapsed = time.time() - s
+
+    import_time = sum(float(r[0]) for r in results) / runs
+    game_time = sum(float(r[1]) for r in results) / runs
+
+    print("Import: %.1fms, Game: %.1fms, Process: %.1fms" % (
+        import_time * 1000, game_time * 1000, elapsed / runs * 1000
+    ))
+    print("pygame loaded: %s, cv2 loaded: %s" % (results[0][2], results[0][3]))
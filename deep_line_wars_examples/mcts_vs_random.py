@@ -0,0 +1,39 @@
+import random
+import time
+
+from deep_line_wars.config import Config
+from deep_line_wars.game import Game
+from deep_line_wars.planner import MCTS
+
+if __name__ == "__main__":
+
+    g = Game(20, 5, Config(
+        gui=Config.GUI(
+            engine="dummy",
+            state_representation="RAW"
+        ),
+        mechanics=Config.Mechanics(
+            ups=-1,
+            fps=-1
+        )
+    ))
+
+    # Player 1 plans with MCTS, player 2 plays random actions
+    planner = MCTS(g, iterations=200, max_depth=30, processes=4, seed=0)
+
+    s = time.time()
+    wins = 0
+    for i in range(5):
+        g.reset()
+        while not g.is_terminal() and g.ticks < 5000:
+            g.step(planner.plan())
+            g.flip_player()
+
+            g.step(random.randint(0, g.get_action_space() - 1))
+            g.flip_player()
+
+        wins += g.winner is g.players[0]
+        print("Game %s: winner %s after %s ticks" % (i, g.winner.id if g.winner else None, g.ticks))
+
+    planner.close()
+    print("MCTS wins: %s/5, Time: %s" % (wins, time.time() - s))
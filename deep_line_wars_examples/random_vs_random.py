@@ -27,20 +27,12 @@ if __name__ == "__main__":
         g.reset()
         while not g.is_terminal():
 
-            # Perform Action
+            # Both players act in the same tick
             a1 = random.randint(0, g.get_action_space()-1)
-            g.step(a1)
-            g.flip_player()
-
-            g.render()
-            g.render_window()
-            """
             a2 = random.randint(0, g.get_action_space()-1)
-            g.step(a2)
-            g.flip_player()
+            g.step_joint((a1, a2))
 
-            g.render()
-            g.render_window()"""
+            g.render_window()
 
 
 
@@ -1,6 +1,7 @@
 import gym
 from gym.utils import seeding
 
+from deep_line_wars.config import Config
 from deep_line_wars.game import Game
 
 
@@ -9,27 +10,41 @@ class DeepLineWarsEnv(gym.Env):
     metadata = {'render.modes': ['human']}
 
     def __init__(self, ai="random", config={}):
-        self.env = Game(config=config)
+        # config maps the Config sections (game, mechanics, gui, map) to their keyword arguments
+        sections = dict(game=Config.Game, mechanics=Config.Mechanics, gui=Config.GUI, map=Config.Map)
+        game_config = Config(**{name: sections[name](**kwargs) for name, kwargs in config.items()})
+
+        self.env = Game(game_config.game.width or 11, game_config.game.height or 11, game_config)
         self.player = self.env.players[0]
-        opponent = self.env.players[1]
+        self.np_random = None
+        self._seed()
 
         self.observation_space = self.env.get_state().shape
-        self.action_space = 4
+        self.action_space = self.env.get_action_space()
 
     def set_representation(self, rep):
-        self.env.representation = rep
+        self.env.config.gui.state_representation = rep
         self.observation_space = self.env.get_state().shape
 
     def step(self, action):
-        data = self.env.step(self.player, action)
-        self.env.update()
-        return data
-
-    def _seed(self):
-        return None
+        # A random opponent, drawn from the seeded game, acts as player 2 in the same tick as the agent. Game.step then
+        # performs the action of the agent and only builds the observation of player 1
+        opponent = self.player.opponent
+        self.env.selected_player = opponent
+        opponent.action_space.perform(self.env.random.randrange(opponent.action_space.size))
+        self.env.selected_player = self.player
+        return self.env.step(action)
+
+    def _seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        self.env.random.seed(seed)
+        return [seed]
 
     def reset(self):
-        return self.env.reset(self.player)
+        self.env.reset()
+        if self.env.selected_player is not self.player:
+            self.env.flip_player()
+        return self.env.get_state()
 
     def _render(self, mode='human', close=False):
         if close:
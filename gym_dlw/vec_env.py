@@ -0,0 +1,177 @@
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+
+def _worker(pipe, env_fns, start):
+    envs = [env_fn() for env_fn in env_fns]
+    observations = None
+    shm = None
+
+    try:
+        # Handshake, report the observation layout and attach to the shared array created from it
+        observation = np.asarray(envs[0].reset())
+        pipe.send((observation.shape, observation.dtype.str))
+        name, shape, dtype = pipe.recv()
+        shm = shared_memory.SharedMemory(name=name)
+        observations = np.ndarray(shape, dtype=dtype, buffer=shm.buf)[start:start + len(envs)]
+
+        while True:
+            command, data = pipe.recv()
+
+            if command == "step":
+                rewards, terminals, infos = [], [], []
+                for i, (env, action) in enumerate(zip(envs, data)):
+                    observation, reward, terminal, info = env.step(action)
+                    if terminal:
+                        # Auto-reset, the last observation of the episode is passed along in info
+                        info = dict(info, terminal_observation=np.asarray(observation).copy())
+                        observation = env.reset()
+                    observations[i] = observation
+                    rewards.append(reward)
+                    terminals.append(terminal)
+                    infos.append(info)
+                pipe.send((rewards, terminals, infos))
+            elif command == "reset":
+                for i, env in enumerate(envs):
+                    observations[i] = env.reset()
+                pipe.send(None)
+            elif command == "seed":
+                pipe.send([env._seed(seed) for env, seed in zip(envs, data)])
+            elif command == "call":
+                name, args, kwargs = data
+                pipe.send([getattr(env, name)(*args, **kwargs) for env in envs])
+            elif command == "close":
+                break
+            else:
+                raise ValueError("Unknown command %s" % command)
+    finally:
+        # Drop the view before closing the mapping it points into
+        observations = None
+        if shm:
+            shm.close()
+        pipe.close()
+
+
+class SubprocVecEnv:
+    """
+    Runs DeepLineWarsEnv instances in worker processes, stepping all of them with one batch of actions.
+
+    Workers write observations straight into a shared memory array of shape (num_envs, *observation_shape), only
+    actions, rewards, terminals and infos go through the pipes. Finished episodes reset automatically, the final
+    observation is then found in info["terminal_observation"].
+    """
+
+    def __init__(self, env_fns, num_workers=None, copy=True, context=None):
+        self.num_envs = len(env_fns)
+        self.copy = copy
+        self.waiting = False
+        self.closed = False
+
+        # Contiguous slices of environments per worker
+        num_workers = min(num_workers or self.num_envs, self.num_envs)
+        bounds = np.linspace(0, self.num_envs, num_workers + 1).astype(int)
+        self.slices = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+        # Workers share the resource tracker of this process, so attaching to the shared array in a worker does not
+        # get it unlinked when that worker exits
+        resource_tracker.ensure_running()
+
+        ctx = multiprocessing.get_context(context)
+        self.pipes = []
+        self.processes = []
+        for s in self.slices:
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(child, env_fns[s], s.start), daemon=True)
+            process.start()
+            child.close()
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+        shape, dtype = self.pipes[0].recv()
+        for pipe in self.pipes[1:]:
+            pipe.recv()
+        self.observation_shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+        shape = (self.num_envs,) + self.observation_shape
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * self.dtype.itemsize))
+        self.observations = np.ndarray(shape, dtype=self.dtype, buffer=self.shm.buf)
+        for pipe in self.pipes:
+            pipe.send((self.shm.name, shape, self.dtype.str))
+
+    def _observations(self):
+        return self.observations.copy() if self.copy else self.observations
+
+    def reset(self):
+        for pipe in self.pipes:
+            pipe.send(("reset", None))
+        for pipe in self.pipes:
+            pipe.recv()
+        return self._observations()
+
+    def step_async(self, actions):
+        if self.waiting:
+            raise RuntimeError("step_async called while waiting for a previous step")
+        actions = np.asarray(actions)
+        for pipe, s in zip(self.pipes, self.slices):
+            pipe.send(("step", actions[s].tolist()))
+        self.waiting = True
+
+    def step_wait(self):
+        if not self.waiting:
+            raise RuntimeError("step_wait called without step_async")
+        rewards, terminals, infos = [], [], []
+        for pipe in self.pipes:
+            r, t, i = pipe.recv()
+            rewards.extend(r)
+            terminals.extend(t)
+            infos.extend(i)
+        self.waiting = False
+        return self._observations(), np.array(rewards, dtype=np.float64), np.array(terminals, dtype=np.bool_), infos
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def seed(self, seed=None):
+        # Consecutive seeds per environment
+        seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        for pipe, s in zip(self.pipes, self.slices):
+            pipe.send(("seed", seeds[s]))
+        # Each environment returns a list of seeds like gym.Env.seed
+        return [seed for pipe in self.pipes for seeds in pipe.recv() for seed in seeds]
+
+    def call(self, name, *args, **kwargs):
+        # Calls a method on every environment and returns the results
+        for pipe in self.pipes:
+            pipe.send(("call", (name, args, kwargs)))
+        return [result for pipe in self.pipes for result in pipe.recv()]
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        # __init__ may have failed before the workers or the shared array were created
+        pipes = getattr(self, "pipes", None) or []
+        for pipe in pipes:
+            try:
+                if self.waiting:
+                    pipe.recv()
+                pipe.send(("close", None))
+            except (BrokenPipeError, EOFError):
+                # The worker is already gone
+                pass
+        for process in getattr(self, "processes", None) or []:
+            process.join()
+        self.observations = None
+        shm = getattr(self, "shm", None)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
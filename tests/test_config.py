@@ -0,0 +1,8 @@
+import pytest
+
+from deep_line_wars.config import Config
+
+
+def test_unknown_target_policy():
+    with pytest.raises(ValueError):
+        Config.Mechanics(target_policy="random")
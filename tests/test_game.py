@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from deep_line_wars.config import Config
+from deep_line_wars.game import Game
+
+
+def rendered_state(game, player):
+    # Observation of the player rendered with it selected, as Game.step would return it
+    selected, flipped = game.selected_player, game.state.flipped
+    game.selected_player = player
+    game.state.flipped = player is game.players[1]
+    try:
+        if game.renderer:
+            game.render()
+            game.renderer.sync()
+            return game.renderer.get_state()
+        return np.array(game.get_state())
+    finally:
+        game.selected_player, game.state.flipped = selected, flipped
+
+
+def play(game):
+    # Yields the joint states of random joint steps every 30 ticks
+    rng = np.random.default_rng(0)
+    size = game.selected_player.action_space.size
+    for step in range(300):
+        states, _, terminal, _ = game.step_joint(rng.integers(0, size, 2))
+        if step % 30 == 29:
+            yield states
+        if terminal:
+            break
+
+
+@pytest.mark.parametrize("engine", ["raster", "opencv", "pygame"])
+@pytest.mark.parametrize("state_representation", ["RGB", "L"])
+@pytest.mark.parametrize("draw_friendly", [True, False])
+def test_joint_state_matches_rendered_states(engine, state_representation, draw_friendly):
+    config = Config(gui=Config.GUI(engine=engine, state_representation=state_representation,
+                                   draw_friendly=draw_friendly, offscreen=True))
+    game = Game(11, 11, config, seed=0)
+    game.reset()
+
+    for states in play(game):
+        for player, state in zip(game.players, states):
+            np.testing.assert_array_equal(state, rendered_state(game, player))
+
+
+@pytest.mark.parametrize("engine", ["raster", "pygame"])
+def test_joint_state_renders_each_player_in_render_thread(engine):
+    # Without draw_friendly both observations are frames drawn for them, not the lagging most recent frame
+    config = Config(gui=Config.GUI(engine=engine, state_representation="RGB", draw_friendly=False, offscreen=True,
+                                   render_thread=True))
+    game = Game(11, 11, config, seed=0)
+    game.reset()
+
+    for states in play(game):
+        for player, state in zip(game.players, states):
+            np.testing.assert_array_equal(state, rendered_state(game, player))
+    game.quit()
+
+
+@pytest.mark.parametrize("raw_layout", ["channels_first", "channels_last"])
+def test_raw_joint_state_matches_flipped_state(raw_layout):
+    game = Game(11, 11, Config(gui=Config.GUI(engine="dummy", state_representation="RAW", raw_layout=raw_layout)),
+                seed=0)
+    game.reset()
+
+    for states in play(game):
+        for player, state in zip(game.players, states):
+            np.testing.assert_array_equal(state, rendered_state(game, player))
+
+
+def test_joint_state_keeps_selected_player():
+    config = Config(gui=Config.GUI(engine="raster", state_representation="RGB", draw_friendly=False))
+    game = Game(11, 11, config, seed=0)
+    game.reset()
+    game.flip_player()
+
+    game.step_joint((0, 0))
+
+    assert game.selected_player is game.players[1]
+    assert game.state.flipped
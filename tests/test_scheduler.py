@@ -0,0 +1,52 @@
+import pytest
+
+from deep_line_wars.config import Config
+from deep_line_wars.game import Game
+from deep_line_wars.scheduler import Scheduler
+
+
+class FakeClock:
+    # Clock that only moves when a tick costs time or the scheduler sleeps. Rates and costs in the tests are powers of
+    # two, so the clock arithmetic is exact
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def run(fps, ups, tick_cost, max_ticks):
+    config = Config(gui=Config.GUI(engine="dummy"), mechanics=Config.Mechanics(fps=fps, ups=ups, statps=0))
+    game = Game(11, 11, config, seed=0)
+    game.reset()
+
+    clock = FakeClock()
+    frames = []
+    game.render_window = lambda: frames.append(clock.now)
+
+    def on_tick(_):
+        clock.now += tick_cost
+
+    ticks = Scheduler(game, on_tick=on_tick, clock=clock, sleep=clock.sleep).run(max_ticks=max_ticks)
+    return ticks, frames, clock.now
+
+
+@pytest.mark.parametrize("fps", [16, 32, 64])
+def test_frame_rate_under_tick_overload(fps):
+    # Ticks cost twice their interval, so the tick backlog never clears, frames still have to come at fps
+    ticks, frames, elapsed = run(fps=fps, ups=128, tick_cost=1 / 64, max_ticks=1500)
+
+    assert ticks == 1500
+    assert len(frames) == pytest.approx(fps * elapsed, rel=0.05)
+
+
+def test_ticks_paced_without_overload():
+    ticks, frames, elapsed = run(fps=32, ups=128, tick_cost=1 / 1024, max_ticks=1280)
+
+    assert ticks == 1280
+    assert elapsed == pytest.approx(10.0, rel=0.01)
+    assert len(frames) == pytest.approx(32 * elapsed, rel=0.05)
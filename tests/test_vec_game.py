@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from deep_line_wars import entity
+from deep_line_wars.config import Config
+from deep_line_wars.game import Game
+from deep_line_wars.vec_game import VecGame
+
+# A tower of player 1 at (5, 1) with a range of 3, and units of player 2 in spawn order as (x, y, health). The first
+# unit is out of range, the next two are the first in range and the closest (tied with the one after, which has less
+# health), the last ties on lowest health
+TOWER = (5, 1)
+UNITS = [(0, 1, 1), (8, 1, 10), (6, 1, 10), (4, 1, 5), (7, 2, 5)]
+
+
+def config(target_policy):
+    return Config(gui=Config.GUI(engine="dummy", state_representation="RAW"),
+                  mechanics=Config.Mechanics(target_policy=target_policy))
+
+
+def game_target(target_policy):
+    game = Game(11, 3, config(target_policy), seed=0)
+    game.reset()
+    p1, p2 = game.players
+
+    row = p1.buildings.add(entity.BasicTower)
+    game.state.update_units(p1.buildings, [row], x=[TOWER[0]], y=[TOWER[1]])
+    p1.buildings.tick_counter[row] = 0
+
+    for x, y, health in UNITS:
+        row = p2.units.add(entity.Militia)
+        game.state.update_units(p2.units, [row], x=[x], y=[y])
+        p2.units.health[row] = health
+
+    entity.Building.shoot(p1)
+    return np.flatnonzero(p2.units.health[:len(UNITS)] < [health for _, _, health in UNITS]).tolist()
+
+
+def vec_game_target(target_policy):
+    games = VecGame(1, 11, 3, config(target_policy), seed=0)
+    games.grid[0, 3][TOWER] = entity.BasicTower.id
+    games.grid[0, 4][TOWER] = 1
+
+    for slot, (x, y, health) in enumerate(UNITS):
+        games.unit_type[0, 1, slot] = entity.Militia.id
+        games.unit_x[0, 1, slot], games.unit_y[0, 1, slot] = x, y
+        games.unit_health[0, 1, slot] = health
+        games.unit_seq[0, 1, slot] = slot + 1
+
+    games._shoot(np.array([0]), 0)
+    return np.flatnonzero(games.unit_health[0, 1, :len(UNITS)] < [health for _, _, health in UNITS]).tolist()
+
+
+@pytest.mark.parametrize("target_policy, target", [("first", 1), ("closest", 2), ("lowest_health", 3)])
+def test_target_policy_matches_game(target_policy, target):
+    assert game_target(target_policy) == [target]
+    assert vec_game_target(target_policy) == [target]
+
+
+def test_matches_game_on_fixed_actions():
+    # A one tile high map without towers leaves nothing to chance, so every observation, reward and terminal flag
+    # has to match Game, including unit layers where units of both players share a tile
+    config = Config(gui=Config.GUI(engine="dummy", state_representation="RAW"))
+    game = Game(11, 1, config, seed=0)
+    game.reset()
+    games = VecGame(1, 11, 1, config, seed=0)
+    games.reset()
+
+    names = games.action_names
+    actions = [names.index(name) for name in names if name.startswith("send") or name == "no_action"]
+    rng = np.random.default_rng(0)
+    for _ in range(3000):
+        action = int(rng.choice(actions))
+        state, reward, terminal, _ = game.step(action)
+        states, rewards, terminals, _ = games.step(np.array([action]))
+
+        np.testing.assert_array_equal(states[0], state)
+        assert rewards[0] == pytest.approx(reward)
+        assert terminals[0] == terminal
+        if terminal:
+            break
+
+        game.flip_player()
+        games.flip_player()
+    assert terminal